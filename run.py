@@ -7,8 +7,18 @@ Executes the complete analysis pipeline from data processing to report generatio
 import sys
 import argparse
 from pathlib import Path
+from typing import List
 from src.data_processor import DataProcessor
+from src import profiler
 from src.derisking_analyzer import DeriskingAnalyzer
+from src.pipeline import Pipeline, Stage
+from src.trade_dataset import TradeDataset
+
+
+DATA_FILE = Path("data/merged/consolidated_trade_data.csv")
+STORE_DIR = Path("data/merged/trade_store")
+OUTPUT_DIR = Path("output/derisking_analysis")
+FIGURES_DIR = OUTPUT_DIR / "figures"
 
 
 def print_header(text: str):
@@ -24,25 +34,47 @@ def print_step(step_num: int, total_steps: int, description: str):
     print("-" * 80)
 
 
-def run_data_processing(skip_extraction: bool = False):
+def run_data_processing(skip_extraction: bool = False, stream: bool = False,
+                        workers: int = 1, incremental: bool = False,
+                        store: bool = False):
     """
     Run data processing pipeline
     
+    main() rejects --stream or --skip-extraction combined with another
+    ingest option; incremental, store and workers combine.
+    
     Args:
         skip_extraction: Skip ZIP extraction if CSVs already exist
+        stream: Read CSVs straight out of the ZIP files (no extraction)
+        workers: Parse ZIP files in this many worker processes (if > 1)
+        incremental: Only parse ZIP files that are new or changed
+        store: Write the partitioned TradeStore instead of the consolidated CSV
     """
     print_step(1, 3, "DATA PROCESSING")
     
     processor = DataProcessor(data_dir="data/raw", output_dir="data/merged")
     
-    if skip_extraction:
-        print("⏭️  Skipping ZIP extraction (using existing CSVs)")
+    if incremental:
+        print("📦 Ingesting new or changed ZIP archives only...")
+        output_file = processor.ingest_incremental(workers=workers, store=store)
+    elif store:
+        print("📦 Writing partitioned trade store (Year / TradeFlowName)...")
+        output_file = processor.write_trade_store(workers=workers)
+    elif workers > 1:
+        print(f"📦 Parsing ZIP archives with {workers} worker processes...")
+        output_file = processor.ingest_zip_files(workers=workers)
+    elif stream:
+        print("📦 Streaming CSV files out of ZIP archives (no extraction)...")
+        output_file = processor.stream_zip_files()
     else:
-        print("📦 Extracting ZIP files...")
-        processor.extract_zip_files()
-    
-    print("\n📊 Concatenating CSV files...")
-    output_file = processor.concatenate_csv_files()
+        if skip_extraction:
+            print("⏭️  Skipping ZIP extraction (using existing CSVs)")
+        else:
+            print("📦 Extracting ZIP files...")
+            processor.extract_zip_files()
+        
+        print("\n📊 Concatenating CSV files...")
+        output_file = processor.concatenate_csv_files()
     
     if output_file:
         print(f"\n✅ Data processing complete!")
@@ -53,11 +85,13 @@ def run_data_processing(skip_extraction: bool = False):
         print(f"\n   Summary:")
         print(f"   - Total rows: {summary.get('total_rows', 0):,}")
         print(f"   - Years: {summary.get('year_range', 'N/A')}")
-        print(f"   - File size: {output_file.stat().st_size / (1024*1024):.2f} MB")
+        if output_file.is_file():
+            print(f"   - File size: {output_file.stat().st_size / (1024*1024):.2f} MB")
         
-        # Cleanup
-        print("\n🧹 Cleaning up temporary files...")
-        processor.cleanup_extracted_files()
+        # Cleanup (only the extract/concatenate path writes temporary files)
+        if not stream and not incremental and not store and workers <= 1:
+            print("\n🧹 Cleaning up temporary files...")
+            processor.cleanup_extracted_files()
         
         return True
     else:
@@ -65,20 +99,39 @@ def run_data_processing(skip_extraction: bool = False):
         return False
 
 
-def run_derisking_analysis():
-    """Run derisking analysis"""
-    print_step(2, 3, "DERISKING ANALYSIS")
+def load_dataset(data_file: Path = DATA_FILE):
+    """
+    Load the consolidated data once for all analysis steps
     
+    Args:
+        data_file: Consolidated CSV file or TradeStore directory
+        
+    Returns:
+        TradeDataset, or None if the data has not been processed yet
+    """
     # Check if consolidated data exists
-    data_file = Path("data/merged/consolidated_trade_data.csv")
     if not data_file.exists():
         print(f"❌ Error: Consolidated data file not found: {data_file}")
         print("   Please run data processing first.")
-        return False
+        return None
+    
+    print(f"📂 Loading consolidated data from {data_file}...")
+    return TradeDataset(data_file)
+
+
+def run_derisking_analysis(dataset: TradeDataset, incremental: bool = False):
+    """
+    Run derisking analysis
+    
+    Args:
+        dataset: Loaded trade data shared by all analysis steps
+        incremental: Only recompute per-year metrics for years whose data changed
+    """
+    print_step(2, 3, "DERISKING ANALYSIS")
     
     print("📈 Running derisking metrics analysis...")
-    analyzer = DeriskingAnalyzer(str(data_file))
-    analyzer.run_complete_analysis()
+    analyzer = DeriskingAnalyzer(dataset)
+    analyzer.run_complete_analysis(incremental=incremental)
     
     print("\n✅ Analysis complete!")
     return True
@@ -119,6 +172,190 @@ def show_results():
     return True
 
 
+class PipelineContext:
+    """State shared by the stages of one run"""
+    
+    def __init__(self, args: argparse.Namespace, data_file: Path):
+        self.args = args
+        self.data_file = data_file
+        self._dataset = None
+    
+    def __getstate__(self):
+        # Without fork, workers receive a pickled context and load the data themselves
+        state = self.__dict__.copy()
+        state['_dataset'] = None
+        return state
+    
+    def share(self, stages: List[Stage]):
+        """
+        Load the data before worker processes start
+        
+        Forked workers inherit the loaded records and their derived views
+        copy-on-write, so no worker re-parses the CSV. The columns are
+        categorical codes and numeric arrays, which are read without
+        touching (and so without copying) their memory pages.
+        
+        Args:
+            stages: Stages about to run
+        """
+        if any(str(self.data_file) in stage.inputs for stage in stages):
+            dataset = self.dataset
+            dataset.india_imports
+            dataset.hs_index
+    
+    @property
+    def dataset(self) -> TradeDataset:
+        """Trade data, loaded on first use so skipped stages never parse it"""
+        if self._dataset is None:
+            with profiler.span('load_dataset'):
+                self._dataset = load_dataset(self.data_file)
+            if self._dataset is None:
+                raise RuntimeError(f"Consolidated data not found: {self.data_file}")
+        return self._dataset
+
+
+def stage_ingest(context: PipelineContext):
+    """Parse the ZIP archives into the consolidated data"""
+    args = context.args
+    success = run_data_processing(
+        skip_extraction=args.skip_extraction,
+        stream=args.stream,
+        workers=args.workers,
+        incremental=args.incremental,
+        store=args.store
+    )
+    if not success:
+        raise RuntimeError("Data processing failed")
+
+
+def stage_metrics(context: PipelineContext):
+    """Compute the derisking metrics and the analysis report"""
+    run_derisking_analysis(context.dataset, context.args.incremental)
+
+
+def stage_covid(context: PipelineContext):
+    """COVID-19 disentanglement of the TDI"""
+    print("\n🦠 Running COVID-19 Disentanglement Analysis...")
+    import src.covid_disentanglement as covid
+    covid.main(context.dataset)
+
+
+def stage_statistical(context: PipelineContext):
+    """Period, trend and structural break tests on the metrics"""
+    print("\n📐 Running Statistical Tests...")
+    import src.statistical_analysis as statistical
+    statistical.main()
+
+
+def stage_causal(context: PipelineContext):
+    """Comparative DiD and HS85 leakage analysis"""
+    print("\n🔗 Running Causal Leakage Analysis...")
+    import src.causal_analysis as causal
+    causal.main(context.dataset)
+
+
+def stage_sensitivity(context: PipelineContext):
+    """HS29 sensitivity test"""
+    print("\n🧪 Running HS29 Sensitivity Analysis...")
+    import src.sensitivity_analysis as sensitivity
+    sensitivity.main(context.dataset)
+
+
+def stage_digital(context: PipelineContext):
+    """Correlation of electronics imports with digital adoption"""
+    print("\n📱 Running Digital Correlation Analysis...")
+    import src.digital_correlation as digital
+    digital.main(context.dataset)
+
+
+def stage_validation(context: PipelineContext):
+    """Data quality validation report"""
+    print("\n🔍 Running Data Validation...")
+    import src.data_validation as validation
+    validation.main(context.dataset)
+
+
+def stage_visualizations(context: PipelineContext):
+    """Figures from the analysis outputs"""
+    print("\n📊 Generating Nature-Quality Visualizations...")
+    import src.visualizations as viz
+    viz.main()
+
+
+def build_pipeline(args: argparse.Namespace, data_file: Path) -> Pipeline:
+    """
+    Declare the pipeline stages
+    
+    Dependencies follow from the declared files: e.g. the statistical
+    tests read metrics_summary.csv, so they run after (and only re-run
+    when) the metrics stage changes it.
+    
+    Args:
+        args: Parsed command-line arguments
+        data_file: Consolidated CSV file or TradeStore directory
+        
+    Returns:
+        Pipeline
+    """
+    data = str(data_file)
+    metrics_summary = str(OUTPUT_DIR / "metrics_summary.csv")
+    
+    stages = [
+        Stage('ingest', stage_ingest,
+              inputs=["data/raw/*.ZIP"],
+              outputs=[data],
+              modules=['src.data_processor'],
+              params={'store': args.store}),
+        Stage('metrics', stage_metrics,
+              inputs=[data],
+              outputs=[str(OUTPUT_DIR / name) for name in [
+                  "metrics_summary.csv", "partner_diversification.csv", "tdi_matrix.csv",
+                  "sector_analysis.csv", "sector_vulnerability.csv", "period_comparison.json",
+                  "cpods_matrix.csv", "product_dmsi.csv", "trade_balance.csv",
+                  "analysis_report.md"]],
+              modules=['src.derisking_analyzer']),
+        Stage('covid', stage_covid,
+              inputs=[data, metrics_summary],
+              outputs=[str(OUTPUT_DIR / "covid_disentanglement.csv"),
+                       str(OUTPUT_DIR / "covid_disentanglement_report.md")],
+              modules=['src.covid_disentanglement']),
+        Stage('statistical', stage_statistical,
+              inputs=[metrics_summary],
+              outputs=[str(OUTPUT_DIR / "statistical_analysis_report.md")],
+              modules=['src.statistical_analysis']),
+        Stage('causal', stage_causal,
+              inputs=[data],
+              outputs=[str(OUTPUT_DIR / "causal_leakage_hs85.csv"),
+                       str(FIGURES_DIR / "figure7_comparative_did.png"),
+                       str(FIGURES_DIR / "figure8_leakage_analysis.png")],
+              modules=['src.causal_analysis']),
+        Stage('sensitivity', stage_sensitivity,
+              inputs=[data],
+              outputs=[str(OUTPUT_DIR / "sensitivity_hs29.csv"),
+                       str(FIGURES_DIR / "figure9_sensitivity_hs29.png")],
+              modules=['src.sensitivity_analysis']),
+        Stage('digital', stage_digital,
+              inputs=[data, "data/external/digital_subscribers_proxy.csv"],
+              outputs=[str(OUTPUT_DIR / "digital_correlation_stats.txt"),
+                       str(FIGURES_DIR / "figure10_digital_correlation.png")],
+              modules=['src.digital_correlation']),
+        Stage('validation', stage_validation,
+              inputs=[data],
+              outputs=[str(OUTPUT_DIR / "data_validation_report.md")],
+              modules=['src.data_validation']),
+        Stage('visualizations', stage_visualizations,
+              inputs=[metrics_summary,
+                      str(OUTPUT_DIR / "sector_analysis.csv"),
+                      str(OUTPUT_DIR / "covid_disentanglement.csv")],
+              outputs=[str(FIGURES_DIR / name) for name in [
+                  "figure1_tdi_trend.png", "figure2_all_metrics.png",
+                  "figure3_sector_heatmap.png", "figure6_digital_paradox.png"]],
+              modules=['src.visualizations']),
+    ]
+    
+    return Pipeline(stages, state_path=str(OUTPUT_DIR / "pipeline_state.json"))
+
+
 def main():
     """Main execution function"""
     parser = argparse.ArgumentParser(
@@ -128,7 +365,17 @@ def main():
 Examples:
   %(prog)s                    # Run complete pipeline
   %(prog)s --skip-extraction  # Skip ZIP extraction (use existing CSVs)
+  %(prog)s --stream           # Read CSVs straight out of the ZIPs (no extraction)
+  %(prog)s --workers 4        # Parse ZIPs in 4 worker processes
+  %(prog)s --incremental      # Only parse new or changed ZIPs / recompute changed years
+  %(prog)s --store            # Use the partitioned Parquet store instead of the CSV
   %(prog)s --analysis-only    # Run only analysis (skip data processing)
+  %(prog)s --force            # Re-run every stage even if its inputs are unchanged
+  %(prog)s --jobs 4           # Run independent analysis stages in 4 processes
+  %(prog)s --profile          # Write a time / memory / rows profile of the run
+
+--workers, --incremental and --store can be combined; --stream and
+--skip-extraction cannot be combined with any of them.
         """
     )
     
@@ -138,6 +385,32 @@ Examples:
         help='Skip ZIP extraction step (use existing CSV files)'
     )
     
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream CSV files directly out of the ZIP archives (no temporary files)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Parse ZIP archives in N worker processes (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only parse ZIP archives and recompute yearly metrics that are new or changed since the last incremental run'
+    )
+    
+    parser.add_argument(
+        '--store',
+        action='store_true',
+        help='Write and analyze the partitioned Parquet trade store instead of the consolidated CSV (requires pyarrow)'
+    )
+    
     parser.add_argument(
         '--analysis-only',
         action='store_true',
@@ -150,40 +423,76 @@ Examples:
         help='Run only data processing (skip analysis)'
     )
     
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-run every stage, ignoring the content hashes of the last run'
+    )
+    
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Run up to N independent pipeline stages concurrently (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record wall time, CPU time, peak RSS and rows scanned of every stage and '
+             'analysis method call (writes profile.json and profile.folded)'
+    )
+    
     args = parser.parse_args()
     
+    # Ingest options: --workers, --incremental and --store combine with each
+    # other; --stream and --skip-extraction are modes of their own
+    if args.workers < 1 or args.jobs < 1:
+        parser.error("--workers and --jobs must be at least 1")
+    combinable = [flag for flag, used in [('--workers', args.workers > 1),
+                                          ('--incremental', args.incremental),
+                                          ('--store', args.store)] if used]
+    if args.stream and combinable:
+        parser.error(f"--stream cannot be combined with {', '.join(combinable)}")
+    if args.skip_extraction and (args.stream or combinable):
+        parser.error("--skip-extraction only applies to the default extract / concatenate ingest")
+    if args.analysis_only and args.process_only:
+        parser.error("--analysis-only and --process-only cannot be combined")
+    
+    data_file = STORE_DIR if args.store else DATA_FILE
+    
     # Print welcome header
     print_header("INDIA DERISKING PROJECT")
     print("Measuring India's Trade Derisking Initiative (2007-2024)")
     print("Novel Multi-Metric Framework with 7 Complementary Indicators")
     
+    pipeline = build_pipeline(args, data_file)
+    context = PipelineContext(args, data_file)
+    
+    if args.process_only:
+        stages = ['ingest']
+    elif args.analysis_only:
+        stages = [name for name in pipeline.order if name != 'ingest']
+    else:
+        stages = pipeline.order
+    
+    if args.profile:
+        profiler.enable()
+    results = {}
+    
     try:
-        # Step 1: Data Processing
-        if not args.analysis_only:
-            success = run_data_processing(skip_extraction=args.skip_extraction)
-            if not success:
-                print("\n❌ Pipeline failed at data processing stage")
-                return 1
-            
-            if args.process_only:
-                print_header("PROCESSING COMPLETE")
-                return 0
+        # Stages run in dependency order; unchanged ones are skipped
+        results = pipeline.run(context, stages=stages, force=args.force,
+                               jobs=args.jobs, prefork=context.share)
         
-        # Step 2: Derisking Analysis
-        success = run_derisking_analysis()
-        if not success:
-            print("\n❌ Pipeline failed at analysis stage")
-            return 1
+        skipped = [name for name, status in results.items() if status == 'skipped']
+        if skipped:
+            print(f"\n⏭️  Up to date (skipped): {', '.join(skipped)}")
         
-        # Step 3: COVID Disentanglement (New Step)
-        print("\n🦠 Running COVID-19 Disentanglement Analysis...")
-        import src.covid_disentanglement as covid
-        covid.main()
-        
-        # Step 4: Visualizations (New Step)
-        print("\n📊 Generating Nature-Quality Visualizations...")
-        import src.visualizations as viz
-        viz.main()
+        if args.process_only:
+            print_header("PROCESSING COMPLETE")
+            return 0
         
         # Final Results Summary
         show_results()
@@ -199,6 +508,9 @@ Examples:
         
         return 0
         
+    except RuntimeError as e:
+        print(f"\n❌ Pipeline failed: {e}")
+        return 1
     except KeyboardInterrupt:
         print("\n\n⚠️  Pipeline interrupted by user")
         return 130
@@ -207,6 +519,13 @@ Examples:
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        if args.profile:
+            json_path, folded_path = profiler.active().save(
+                str(OUTPUT_DIR), run_info={'argv': sys.argv[1:], 'stages': results}
+            )
+            print(f"\n⏱️  Profile: {json_path}")
+            print(f"   Flame graph input: {folded_path} (e.g. flamegraph.pl {folded_path.name} > profile.svg)")
 
 
 if __name__ == "__main__":
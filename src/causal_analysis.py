@@ -8,7 +8,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+from typing import Union
 import logging
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,17 +27,15 @@ NATURE_COLORS = {
 class CausalAnalyzer:
     """Perform causal validation and leakage analysis"""
     
-    def __init__(self, data_path: str, output_dir: str = "output/derisking_analysis"):
-        self.data_path = Path(data_path)
+    def __init__(self, data_path: Union[str, TradeDataset], output_dir: str = "output/derisking_analysis"):
+        self.dataset = TradeDataset.coerce(data_path)
+        self.data_path = self.dataset.data_path
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.figures_dir = self.output_dir / "figures"
         self.figures_dir.mkdir(parents=True, exist_ok=True)
         
-        # Load Data
-        logger.info("Loading data for causal analysis...")
-        self.df = pd.read_csv(data_path)
-        self.df.columns = self.df.columns.str.strip()
+        self.df = self.dataset.df
         
     def run_comparative_analysis(self):
         """
@@ -71,14 +71,11 @@ class CausalAnalyzer:
         
         results = []
         
-        # Filter for India Imports (Partner=IND, Flow=Export)
-        ind_imports = self.df[
-            (self.df['PartnerISO3'] == 'IND') & 
-            (self.df['TradeFlowName'] == 'Export')
-        ]
+        # India Imports (Partner=IND, Flow=Export)
+        ind_imports = self.dataset.india_imports
         
         # Filter for HS 85
-        tech_imports = ind_imports[ind_imports['ProductCode'].astype(str).str.startswith(sector)]
+        tech_imports = ind_imports[self.dataset.hs_mask([sector], ind_imports)]
         
         # Limit to 2023 because 2024 data might be incomplete for non-major partners
         for year in range(2015, 2024):
@@ -141,8 +138,8 @@ class CausalAnalyzer:
         plt.savefig(self.figures_dir / 'figure8_leakage_analysis.png', dpi=300)
         logger.info("Saved Figure 8")
 
-def main():
-    analyzer = CausalAnalyzer('data/merged/consolidated_trade_data.csv')
+def main(data_path: Union[str, TradeDataset] = 'data/merged/consolidated_trade_data.csv'):
+    analyzer = CausalAnalyzer(data_path)
     analyzer.run_comparative_analysis()
     analyzer.run_leakage_analysis()
 
@@ -7,7 +7,9 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from scipy import stats
+from typing import Union
 import logging
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,10 +20,10 @@ class COVIDDisentangler:
     Disentangle COVID-19 effects from policy effects
     """
     
-    def __init__(self, data_path: str):
-        self.data_path = Path(data_path)
-        self.df = pd.read_csv(data_path)
-        self.df.columns = self.df.columns.str.strip()
+    def __init__(self, data_path: Union[str, TradeDataset]):
+        self.dataset = TradeDataset.coerce(data_path)
+        self.data_path = self.dataset.data_path
+        self.df = self.dataset.df
         
         # Define pandemic-sensitive HS codes (User Provided List)
         self.pandemic_sensitive_hs = {
@@ -48,7 +50,7 @@ class COVIDDisentangler:
         # Filter out pandemic-sensitive sectors
         pandemic_codes = list(self.pandemic_sensitive_hs.keys())
         
-        non_pandemic_df = self.df[~self.df['ProductCode'].astype(str).str[:2].isin(pandemic_codes)]
+        non_pandemic_df = self.df[~self.dataset.hs_mask(pandemic_codes)]
         
         logger.info(f"Excluded pandemic goods: {len(self.df) - len(non_pandemic_df)} records removed")
         logger.info(f"Remaining records: {len(non_pandemic_df)}")
@@ -223,14 +225,20 @@ class COVIDDisentangler:
         return "\n".join(report)
 
 
-def main():
-    """Run COVID disentanglement analysis"""
+def main(data_path: Union[str, TradeDataset] = 'data/merged/consolidated_trade_data.csv'):
+    """
+    Run COVID disentanglement analysis
+    
+    Args:
+        data_path: Path to consolidated CSV file or TradeStore directory,
+            or an already loaded TradeDataset
+    """
     
     # Load original TDI results
     original_tdi = pd.read_csv('output/derisking_analysis/metrics_summary.csv')
     
     # Run disentanglement
-    disentangler = COVIDDisentangler('data/merged/consolidated_trade_data.csv')
+    disentangler = COVIDDisentangler(data_path)
     results = disentangler.compare_with_vs_without_pandemic_goods(original_tdi)
     
     # Generate report
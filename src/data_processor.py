@@ -4,12 +4,17 @@ Handles extraction, concatenation, and saving of trade data
 """
 
 import os
+import json
+import hashlib
 import pandas as pd
 import zipfile
 import glob
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 import logging
+from src.trade_schema import CSV_DTYPES, NUMERIC_DTYPES, apply_trade_schema, read_trade_csv
+from src.trade_store import TradeStore, read_trade_data
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +23,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Integer columns of the trade schema (Year, TradeFlowCode)
+INTEGER_DTYPES = {col: dtype for col, dtype in NUMERIC_DTYPES.items() if dtype.startswith('int')}
+
+
+def _parse_zip_file(zip_path: Path) -> pd.DataFrame:
+    """
+    Decompress and parse every CSV member of one ZIP file
+    
+    Module-level so it can be shipped to worker processes.
+    
+    Args:
+        zip_path: Path to ZIP file
+        
+    Returns:
+        DataFrame with the rows of all CSV members of the archive, in the
+        canonical trade schema
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        csv_members = [f for f in zip_ref.namelist() if f.endswith('.csv')]
+        dfs = []
+        for csv_member in csv_members:
+            with zip_ref.open(csv_member) as handle:
+                dfs.append(read_trade_csv(handle))
+    
+    if len(dfs) == 1:
+        return dfs[0]
+    return apply_trade_schema(pd.concat(dfs, ignore_index=True))
+
 
 class DataProcessor:
     """
@@ -36,6 +69,13 @@ class DataProcessor:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
+        # Incremental ingest state: per-ZIP manifest and parsed partitions
+        self.manifest_path = self.output_dir / "ingest_manifest.json"
+        self.partitions_dir = self.output_dir / "partitions"
+        
+        # Partitioned columnar store (alternative to the consolidated CSV)
+        self.store = TradeStore(self.output_dir / "trade_store")
+        
         logger.info(f"DataProcessor initialized with data_dir={data_dir}, output_dir={output_dir}")
     
     def extract_zip_files(self, pattern: str = "*.ZIP") -> List[Path]:
@@ -71,6 +111,48 @@ class DataProcessor:
         logger.info(f"Total CSV files extracted: {len(extracted_files)}")
         return extracted_files
     
+    def get_zip_files(self, pattern: str = "*.ZIP") -> List[Path]:
+        """
+        Get all ZIP files matching the pattern
+        
+        Args:
+            pattern: Glob pattern for ZIP files
+            
+        Returns:
+            Sorted list of ZIP file paths (same order as get_csv_files)
+        """
+        zip_files = sorted(self.data_dir.glob(pattern))
+        logger.info(f"Found {len(zip_files)} ZIP files matching pattern '{pattern}'")
+        return zip_files
+    
+    def iter_zip_csv_chunks(self, zip_path: Path, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Read CSV members straight from an open ZIP archive, chunk by chunk
+        
+        Args:
+            zip_path: Path to ZIP file
+            chunksize: Number of rows per chunk
+            
+        Yields:
+            DataFrame chunks of the CSV members, in archive order
+        """
+        # Integer columns are typed per chunk by apply_trade_schema, so a
+        # missing Year does not fail the whole read (as in read_trade_csv)
+        dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col not in INTEGER_DTYPES}
+        
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            csv_members = [f for f in zip_ref.namelist() if f.endswith('.csv')]
+            
+            for csv_member in csv_members:
+                with zip_ref.open(csv_member) as handle:
+                    for chunk in pd.read_csv(handle, chunksize=chunksize, dtype=dtypes):
+                        chunk = apply_trade_schema(chunk)
+                        # Chunks with missing values keep whole numbers ("2015", not "2015.0")
+                        for col, dtype in INTEGER_DTYPES.items():
+                            if col in chunk.columns and chunk[col].dtype != dtype:
+                                chunk[col] = chunk[col].astype(dtype.capitalize())
+                        yield chunk
+    
     def get_csv_files(self, pattern: str = "DataJobID-*.csv") -> List[Path]:
         """
         Get all CSV files matching the pattern
@@ -113,7 +195,7 @@ class DataProcessor:
         dfs = []
         for csv_file in csv_files:
             try:
-                df = pd.read_csv(csv_file)
+                df = read_trade_csv(csv_file)
                 dfs.append(df)
                 logger.info(f"Read {len(df)} rows from {csv_file.name}")
             except Exception as e:
@@ -125,7 +207,7 @@ class DataProcessor:
             return None
         
         # Concatenate all DataFrames
-        consolidated_df = pd.concat(dfs, ignore_index=True)
+        consolidated_df = apply_trade_schema(pd.concat(dfs, ignore_index=True))
         
         # Save to CSV
         consolidated_df.to_csv(output_path, index=False)
@@ -137,18 +219,474 @@ class DataProcessor:
         
         return output_path
     
+    def stream_zip_files(
+        self,
+        zip_files: Optional[List[Path]] = None,
+        output_filename: str = "consolidated_trade_data.csv",
+        chunksize: int = 100_000
+    ) -> Path:
+        """
+        Consolidate CSV data directly from ZIP files without extracting them
+        
+        Each CSV member is streamed out of its archive in chunks and appended
+        to the consolidated file, so no temporary files are written to
+        data_dir and no cleanup pass is needed. If any archive cannot be
+        read completely, the run is aborted and an existing consolidated
+        file is left as it was.
+        
+        Args:
+            zip_files: List of ZIP file paths (if None, will find all ZIPs)
+            output_filename: Name of the output file
+            chunksize: Number of rows read per chunk
+            
+        Returns:
+            Path to the consolidated CSV file, or None if streaming failed
+        """
+        if zip_files is None:
+            zip_files = self.get_zip_files()
+        
+        if not zip_files:
+            logger.warning("No ZIP files found to stream")
+            return None
+        
+        output_path = self.output_dir / output_filename
+        tmp_path = output_path.with_name(output_path.name + '.tmp')
+        
+        columns = None
+        total_rows = 0
+        
+        # Written to a temporary file that only replaces the output once
+        # every archive streamed completely
+        try:
+            with open(tmp_path, 'w', newline='') as out:
+                for zip_path in zip_files:
+                    zip_rows = 0
+                    for chunk in self.iter_zip_csv_chunks(zip_path, chunksize):
+                        if columns is None:
+                            # First chunk defines the header of the consolidated file
+                            columns = list(chunk.columns)
+                            chunk.to_csv(out, index=False)
+                        else:
+                            chunk.reindex(columns=columns).to_csv(out, index=False, header=False)
+                        zip_rows += len(chunk)
+                    
+                    total_rows += zip_rows
+                    logger.info(f"Streamed {zip_rows} rows from {zip_path.name}")
+        except Exception as e:
+            logger.error(f"Error streaming {zip_path}: {e}; {output_filename} left unchanged")
+            tmp_path.unlink(missing_ok=True)
+            return None
+        
+        if columns is None:
+            logger.error("No valid CSV data found in ZIP files")
+            tmp_path.unlink()
+            return None
+        
+        os.replace(tmp_path, output_path)
+        
+        logger.info(f"✓ Streamed {len(zip_files)} ZIP files into {output_filename}")
+        logger.info(f"✓ Total rows written: {total_rows:,}")
+        logger.info(f"✓ Output saved to: {output_path}")
+        
+        return output_path
+    
+    def load_zip_files(
+        self,
+        zip_files: Optional[List[Path]] = None,
+        workers: Optional[int] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Parse ZIP files in a process pool and merge the results
+        
+        Each worker decompresses and parses one archive; the parent only
+        concatenates the returned frames, in the same sorted order as
+        get_zip_files / get_csv_files.
+        
+        Args:
+            zip_files: List of ZIP file paths (if None, will find all ZIPs)
+            workers: Number of worker processes (default: number of CPUs)
+            
+        Returns:
+            Merged DataFrame, or None if nothing could be parsed
+        """
+        if zip_files is None:
+            zip_files = self.get_zip_files()
+        
+        if not zip_files:
+            logger.warning("No ZIP files found to load")
+            return None
+        
+        dfs = list(self._parse_archives(zip_files, workers).values())
+        
+        if not dfs:
+            logger.error("No valid ZIP files to merge")
+            return None
+        
+        # Categoricals with differing categories concatenate to object columns
+        return apply_trade_schema(pd.concat(dfs, ignore_index=True))
+    
+    def _parse_archives(
+        self,
+        zip_files: List[Path],
+        workers: Optional[int] = None
+    ) -> Dict[Path, pd.DataFrame]:
+        """
+        Parse ZIP files one archive per worker process
+        
+        Args:
+            zip_files: List of ZIP file paths
+            workers: Number of worker processes (default: number of CPUs)
+            
+        Returns:
+            Dictionary mapping each successfully parsed ZIP path to its
+            DataFrame, in the order of zip_files
+        """
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(zip_files))
+        logger.info(f"Parsing {len(zip_files)} ZIP files with {workers} worker(s)")
+        
+        parsed = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_parse_zip_file, zip_path) for zip_path in zip_files]
+            
+            # Collect in submission order so the output order is deterministic
+            for zip_path, future in zip(zip_files, futures):
+                try:
+                    df = future.result()
+                    parsed[zip_path] = df
+                    logger.info(f"Parsed {len(df)} rows from {zip_path.name}")
+                except Exception as e:
+                    logger.error(f"Error parsing {zip_path}: {e}")
+        
+        return parsed
+    
+    def ingest_zip_files(
+        self,
+        zip_files: Optional[List[Path]] = None,
+        output_filename: str = "consolidated_trade_data.csv",
+        workers: Optional[int] = None
+    ) -> Path:
+        """
+        Parse ZIP files in parallel and save the consolidated CSV
+        
+        Args:
+            zip_files: List of ZIP file paths (if None, will find all ZIPs)
+            output_filename: Name of the output file
+            workers: Number of worker processes (default: number of CPUs)
+            
+        Returns:
+            Path to the consolidated CSV file
+        """
+        consolidated_df = self.load_zip_files(zip_files, workers=workers)
+        
+        if consolidated_df is None:
+            return None
+        
+        output_path = self.output_dir / output_filename
+        consolidated_df.to_csv(output_path, index=False)
+        
+        logger.info(f"✓ Consolidated ZIP files into {output_filename}")
+        logger.info(f"✓ Total rows written: {len(consolidated_df):,}")
+        logger.info(f"✓ Output saved to: {output_path}")
+        
+        return output_path
+    
+    def write_trade_store(
+        self,
+        df: Optional[pd.DataFrame] = None,
+        workers: Optional[int] = None
+    ) -> Path:
+        """
+        Write trade data as a Parquet store partitioned by Year and TradeFlowName
+        
+        Args:
+            df: Trade records (if None, all ZIP files are parsed)
+            workers: Number of worker processes used when parsing ZIP files
+            
+        Returns:
+            Path to the TradeStore directory
+        """
+        if df is None:
+            df = self.load_zip_files(workers=workers)
+        
+        if df is None:
+            return None
+        
+        return self.store.write(df)
+    
+    def load_manifest(self) -> Dict:
+        """
+        Load the incremental ingest manifest
+        
+        Returns:
+            Manifest dictionary (empty if no previous incremental run)
+        """
+        if not self.manifest_path.exists():
+            return {}
+        
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading manifest {self.manifest_path}: {e}")
+            return {}
+    
+    def _save_manifest(self, manifest: Dict):
+        """Save the incremental ingest manifest"""
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logger.info(f"✓ Manifest saved to: {self.manifest_path}")
+    
+    @staticmethod
+    def _file_digest(path: Path, block_size: int = 1 << 20) -> str:
+        """SHA-256 hex digest of a file's content"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _output_matches_manifest(self, output_path: Path, manifest: Dict) -> bool:
+        """
+        True if the consolidated CSV is the file recorded in the manifest
+        
+        Compares size first so a changed file is usually detected without
+        hashing it.
+        """
+        if not output_path.exists() or 'output_sha256' not in manifest:
+            return False
+        if output_path.stat().st_size != manifest.get('output_size'):
+            return False
+        return self._file_digest(output_path) == manifest['output_sha256']
+    
+    def ingest_incremental(
+        self,
+        zip_files: Optional[List[Path]] = None,
+        output_filename: str = "consolidated_trade_data.csv",
+        workers: int = 1,
+        store: bool = False
+    ) -> Path:
+        """
+        Update the consolidated output, parsing only new or changed ZIP files
+        
+        The manifest records each ZIP's content hash, size, years and the
+        row range it contributed to the consolidated output, and every
+        parsed ZIP is kept as a partition in partitions_dir. On a re-run,
+        unchanged ZIPs are served from their partitions.
+        
+        For the CSV output, if the only change is new ZIPs sorting after all
+        existing ones and the file still has the size and content hash the
+        manifest recorded, their rows are appended; otherwise the file is
+        rewritten from the partitions. For the TradeStore output, only the
+        years touched by new, changed or removed ZIPs are rewritten.
+        
+        Args:
+            zip_files: List of ZIP file paths (if None, will find all ZIPs)
+            output_filename: Name of the output CSV file
+            workers: Number of worker processes for parsing changed ZIPs
+            store: Maintain the partitioned TradeStore instead of the CSV
+            
+        Returns:
+            Path to the consolidated CSV file or TradeStore directory
+        """
+        if zip_files is None:
+            zip_files = self.get_zip_files()
+        
+        if not zip_files:
+            logger.warning("No ZIP files found to ingest")
+            return None
+        
+        if store:
+            output_path = self.store.store_dir
+            output_name = output_path.name
+            output_exists = self.store.exists()
+        else:
+            output_path = self.output_dir / output_filename
+            output_name = output_filename
+            output_exists = output_path.exists()
+        
+        self.partitions_dir.mkdir(parents=True, exist_ok=True)
+        
+        previous = self.load_manifest()
+        if previous.get('output_file') != output_name or not output_exists:
+            previous = {}
+        previous_archives = {a['file']: a for a in previous.get('archives', [])}
+        
+        # Find new or changed archives
+        fingerprints = {}
+        changed = []
+        for zip_path in zip_files:
+            fingerprints[zip_path] = {
+                'sha256': self._file_digest(zip_path),
+                'size': zip_path.stat().st_size
+            }
+            entry = previous_archives.get(zip_path.name)
+            unchanged = (
+                entry is not None and
+                entry['sha256'] == fingerprints[zip_path]['sha256'] and
+                entry['size'] == fingerprints[zip_path]['size'] and
+                (self.partitions_dir / entry['partition']).exists()
+            )
+            if not unchanged:
+                changed.append(zip_path)
+        
+        current_names = [zip_path.name for zip_path in zip_files]
+        removed = [name for name in previous_archives if name not in current_names]
+        
+        logger.info(f"Incremental ingest: {len(zip_files) - len(changed)} unchanged, "
+                    f"{len(changed)} new/changed, {len(removed)} removed")
+        
+        # Parse only what changed and store it as partitions
+        if changed:
+            if workers > 1:
+                parsed = self._parse_archives(changed, workers)
+            else:
+                parsed = {}
+                for zip_path in changed:
+                    try:
+                        parsed[zip_path] = _parse_zip_file(zip_path)
+                        logger.info(f"Parsed {len(parsed[zip_path])} rows from {zip_path.name}")
+                    except Exception as e:
+                        logger.error(f"Error parsing {zip_path}: {e}")
+            
+            for zip_path, df in parsed.items():
+                df.to_pickle(self.partitions_dir / f"{zip_path.stem}.pkl")
+            
+            failed = [zip_path for zip_path in changed if zip_path not in parsed]
+            zip_files = [zip_path for zip_path in zip_files if zip_path not in failed]
+            changed = [zip_path for zip_path in changed if zip_path in parsed]
+        else:
+            parsed = {}
+        
+        for name in removed:
+            partition = self.partitions_dir / previous_archives[name]['partition']
+            if partition.exists():
+                partition.unlink()
+                logger.info(f"Removed partition: {partition.name}")
+        
+        if not zip_files:
+            logger.error("No valid ZIP files to consolidate")
+            return None
+        
+        def load_partition(zip_path: Path) -> pd.DataFrame:
+            if zip_path in parsed:
+                return parsed[zip_path]
+            return pd.read_pickle(self.partitions_dir / f"{zip_path.stem}.pkl")
+        
+        def archive_years(zip_path: Path) -> List[int]:
+            if zip_path in parsed:
+                return sorted(int(y) for y in parsed[zip_path]['Year'].dropna().unique())
+            return previous_archives[zip_path.name]['years']
+        
+        columns = previous.get('columns')
+        
+        if store:
+            # Years whose rows may differ from what the store holds
+            touched_years = set()
+            for zip_path in changed:
+                touched_years.update(archive_years(zip_path))
+                if zip_path.name in previous_archives:
+                    touched_years.update(previous_archives[zip_path.name]['years'])
+            for name in removed:
+                touched_years.update(previous_archives[name]['years'])
+            
+            if not previous:
+                dfs = [load_partition(zip_path) for zip_path in zip_files]
+                consolidated_df = apply_trade_schema(pd.concat(dfs, ignore_index=True))
+                columns = list(consolidated_df.columns)
+                self.store.write(consolidated_df)
+            elif touched_years:
+                # Rebuild touched years from every archive that covers them
+                dfs = []
+                for zip_path in zip_files:
+                    if touched_years.intersection(archive_years(zip_path)):
+                        df = load_partition(zip_path)
+                        dfs.append(df[df['Year'].isin(touched_years)])
+                self.store.delete_years(touched_years)
+                if dfs:
+                    self.store.replace_partitions(
+                        apply_trade_schema(pd.concat(dfs, ignore_index=True))
+                    )
+                logger.info(f"✓ Updated trade store years {sorted(touched_years)}")
+            else:
+                logger.info(f"✓ {output_name} is up to date")
+        else:
+            # Existing rows stay in place when changes are pure appends at the
+            # end and the file is still exactly what the last run wrote
+            # (it may have been rebuilt by another ingest mode since)
+            previous_order = [a['file'] for a in previous.get('archives', [])]
+            kept = [zip_path.name for zip_path in zip_files if zip_path not in changed]
+            append_only = (
+                bool(previous_order) and
+                not removed and
+                kept == previous_order and
+                current_names[:len(previous_order)] == previous_order and
+                self._output_matches_manifest(output_path, previous)
+            )
+            
+            if append_only:
+                if changed:
+                    with open(output_path, 'a', newline='') as out:
+                        for zip_path in changed:
+                            load_partition(zip_path).reindex(columns=columns).to_csv(
+                                out, index=False, header=False
+                            )
+                    logger.info(f"✓ Appended {len(changed)} new ZIP files to {output_name}")
+                else:
+                    logger.info(f"✓ {output_name} is up to date")
+            else:
+                dfs = [load_partition(zip_path) for zip_path in zip_files]
+                consolidated_df = apply_trade_schema(pd.concat(dfs, ignore_index=True))
+                columns = list(consolidated_df.columns)
+                consolidated_df.to_csv(output_path, index=False)
+                logger.info(f"✓ Rebuilt {output_name} from {len(zip_files)} partitions")
+        
+        # Record content hash, size, years and contributed row range per archive
+        archives = []
+        row_start = 0
+        for zip_path in zip_files:
+            if zip_path in parsed:
+                rows = len(parsed[zip_path])
+            else:
+                rows = previous_archives[zip_path.name]['rows']
+            archives.append({
+                'file': zip_path.name,
+                'sha256': fingerprints[zip_path]['sha256'],
+                'size': fingerprints[zip_path]['size'],
+                'partition': f"{zip_path.stem}.pkl",
+                'years': archive_years(zip_path),
+                'rows': rows,
+                'row_start': row_start,
+                'row_end': row_start + rows
+            })
+            row_start += rows
+        
+        manifest = {
+            'output_file': output_name,
+            'columns': columns,
+            'total_rows': row_start,
+            'archives': archives
+        }
+        if not store:
+            manifest['output_size'] = output_path.stat().st_size
+            manifest['output_sha256'] = self._file_digest(output_path)
+        self._save_manifest(manifest)
+        
+        logger.info(f"✓ Total rows in {output_name}: {row_start:,}")
+        return output_path
+    
     def get_data_summary(self, csv_path: Path) -> Dict:
         """
-        Get summary statistics for a CSV file using pandas
+        Get summary statistics for a CSV file or TradeStore using pandas
         
         Args:
-            csv_path: Path to CSV file
+            csv_path: Path to CSV file or TradeStore directory
             
         Returns:
             Dictionary with summary statistics
         """
         try:
-            df = pd.read_csv(csv_path)
+            df = read_trade_data(csv_path)
             
             # Extract years
             years = sorted(df['Year'].dropna().unique().astype(int).tolist())
@@ -189,13 +727,23 @@ class DataProcessor:
         logger.info(f"✓ Cleaned up {removed_count} temporary files")
         return removed_count
     
-    def process_all(self, extract: bool = True, cleanup: bool = True) -> Path:
+    def process_all(self, extract: bool = True, cleanup: bool = True,
+                    stream: bool = False, workers: int = 1,
+                    incremental: bool = False, store: bool = False) -> Path:
         """
         Complete processing pipeline: extract, concatenate, cleanup, and save
         
         Args:
             extract: Whether to extract ZIP files first
             cleanup: Whether to remove temporary files after processing
+            stream: Read CSVs straight out of the ZIP files instead of
+                extracting them (extract and cleanup are then not needed)
+            workers: Number of worker processes; values > 1 parse one ZIP
+                file per worker straight from the archives
+            incremental: Only parse ZIP files that are new or changed since
+                the last incremental run (see ingest_incremental)
+            store: Write the partitioned TradeStore instead of the
+                consolidated CSV
             
         Returns:
             Path to consolidated output file
@@ -204,6 +752,30 @@ class DataProcessor:
         logger.info("STARTING DATA PROCESSING PIPELINE")
         logger.info("=" * 80)
         
+        if incremental:
+            logger.info("\n[Step 1/1] Incrementally ingesting new or changed ZIP archives...")
+            output_path = self.ingest_incremental(workers=workers, store=store)
+            self._log_summary(output_path)
+            return output_path
+        
+        if store:
+            logger.info("\n[Step 1/1] Writing partitioned trade store...")
+            output_path = self.write_trade_store(workers=workers)
+            self._log_summary(output_path)
+            return output_path
+        
+        if workers > 1:
+            logger.info(f"\n[Step 1/1] Parsing ZIP archives with {workers} workers...")
+            output_path = self.ingest_zip_files(workers=workers)
+            self._log_summary(output_path)
+            return output_path
+        
+        if stream:
+            logger.info("\n[Step 1/1] Streaming CSV files out of ZIP archives...")
+            output_path = self.stream_zip_files()
+            self._log_summary(output_path)
+            return output_path
+        
         # Step 1: Extract ZIP files
         if extract:
             logger.info("\n[Step 1/4] Extracting ZIP files...")
@@ -230,7 +802,12 @@ class DataProcessor:
         else:
             logger.info("\n[Step 4/4] Skipping cleanup (cleanup=False)")
         
-        # Generate summary
+        self._log_summary(output_path)
+        
+        return output_path
+    
+    def _log_summary(self, output_path: Optional[Path]):
+        """Log summary statistics of the consolidated file"""
         if output_path and output_path.exists():
             logger.info("\n" + "=" * 80)
             logger.info("PROCESSING COMPLETE")
@@ -242,8 +819,6 @@ class DataProcessor:
             logger.info(f"  - Columns: {summary.get('columns')}")
             logger.info(f"  - Years: {summary.get('years')}")
             logger.info(f"  - Year Range: {summary.get('year_range')}")
-        
-        return output_path
 
 
 def main():
@@ -6,8 +6,9 @@ Validates trade data interpretation and quality
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 import logging
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,11 +19,11 @@ class DataValidator:
     Comprehensive data validation for trade analysis
     """
     
-    def __init__(self, data_path: str):
-        """Initialize with consolidated trade data"""
-        self.data_path = Path(data_path)
-        self.df = pd.read_csv(data_path)
-        self.df.columns = self.df.columns.str.strip()
+    def __init__(self, data_path: Union[str, TradeDataset]):
+        """Initialize with consolidated trade data (path or loaded TradeDataset)"""
+        self.dataset = TradeDataset.coerce(data_path)
+        self.data_path = self.dataset.data_path
+        self.df = self.dataset.df
         logger.info(f"Loaded {len(self.df)} records for validation")
     
     def validate_all(self) -> Dict:
@@ -130,7 +131,7 @@ class DataValidator:
             (self.df['Year'] == 2023)
         ]
         
-        partner_totals = imports_2023.groupby('ReporterISO3')['TradeValue in 1000 USD'].sum()
+        partner_totals = imports_2023.groupby('ReporterISO3', observed=True)['TradeValue in 1000 USD'].sum()
         total_imports = partner_totals.sum()
         partner_shares = (partner_totals / total_imports * 100).sort_values(ascending=False)
         
@@ -210,7 +211,7 @@ class DataValidator:
         logger.info("-" * 80)
         
         # Check year coverage
-        years = sorted(self.df['Year'].unique())
+        years = sorted(int(y) for y in self.df['Year'].unique())
         expected_years = list(range(2007, 2025))
         missing_years = set(expected_years) - set(years)
         
@@ -279,9 +280,9 @@ class DataValidator:
         return "\n".join(report)
 
 
-def main():
+def main(data_path: Union[str, TradeDataset] = 'data/merged/consolidated_trade_data.csv'):
     """Run validation"""
-    validator = DataValidator('data/merged/consolidated_trade_data.csv')
+    validator = DataValidator(data_path)
     results = validator.validate_all()
     
     # Generate report
@@ -4,11 +4,17 @@ Main analysis orchestrator for India's derisking project
 """
 
 import csv
+import hashlib
 import json
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Union
 import logging
+import numpy as np
+import pandas as pd
 from src.metrics_calculator import DeriskingMetrics
+from src.pipeline import code_digest
+from src.reference_data import COUNTRY_GROUPS
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,12 +25,13 @@ class DeriskingAnalyzer:
     Orchestrate complete derisking analysis
     """
     
-    def __init__(self, data_path: str, output_dir: str = "output/derisking_analysis"):
+    def __init__(self, data_path: Union[str, TradeDataset],
+                 output_dir: str = "output/derisking_analysis"):
         """
         Initialize analyzer
         
         Args:
-            data_path: Path to consolidated trade data
+            data_path: Path to consolidated trade data, or a loaded TradeDataset
             output_dir: Directory for output files
         """
         self.calculator = DeriskingMetrics(data_path)
@@ -37,65 +44,124 @@ class DeriskingAnalyzer:
         self.intervention_start = 2020
         self.intervention_end = 2024
         
+        # Per-year tables also cover newer years of data (e.g. a freshly
+        # added 2025); the study periods above stay fixed
+        self.analysis_end = self.intervention_end
+        data_years = self.calculator.dataset.import_year_bounds
+        if data_years:
+            self.analysis_end = max(self.analysis_end, max(data_years))
+        
+        # Per-year input fingerprints behind the saved metric rows (incremental mode)
+        self.state_path = self.output_dir / "metric_state.json"
+        
+        # Strategic sectors (HS 2-digit codes)
+        self.strategic_sectors = {
+            '84': {'name': 'Machinery & Mechanical Appliances', 'criticality': 5},
+            '85': {'name': 'Electrical Machinery & Equipment', 'criticality': 5},
+            '29': {'name': 'Organic Chemicals', 'criticality': 4},
+            '30': {'name': 'Pharmaceutical Products', 'criticality': 5},
+            '39': {'name': 'Plastics', 'criticality': 3},
+            '72': {'name': 'Iron & Steel', 'criticality': 4},
+            '90': {'name': 'Optical & Medical Instruments', 'criticality': 4}
+        }
+        
         logger.info(f"Analyzer initialized. Output: {self.output_dir}")
     
-    def run_complete_analysis(self):
-        """Run all analyses and generate reports"""
+    def run_complete_analysis(self, incremental: bool = False):
+        """
+        Run all analyses and generate reports
+        
+        Args:
+            incremental: Only recompute the per-year rows of metrics_summary,
+                partner_diversification and sector_analysis for years whose
+                input data changed since the last run, and merge them into
+                the existing files
+        """
         logger.info("=" * 80)
         logger.info("STARTING COMPLETE DERISKING ANALYSIS")
         logger.info("=" * 80)
         
+        all_years = list(range(self.baseline_start, self.analysis_end + 1))
+        fingerprints = self._year_fingerprints(all_years)
+        version = self._metric_version()
+        years = self._changed_years(fingerprints, version) if incremental else all_years
+        if incremental:
+            logger.info(f"Incremental run: recomputing years {years}")
+        
         # 1. Time series analysis
         logger.info("\n[1/5] Calculating time series metrics...")
-        metrics_summary = self.analyze_time_series()
-
-        self._save_csv(metrics_summary, "metrics_summary.csv")
+        metrics_summary = self.analyze_time_series(years)
+        metrics_summary = self._save_year_rows(metrics_summary, "metrics_summary.csv", years, incremental)
         
         # 2. Partner diversification analysis
         logger.info("\n[2/5] Analyzing partner diversification...")
-        partner_analysis = self.analyze_partner_diversification()
-        self._save_csv(partner_analysis, "partner_diversification.csv")
+        partner_analysis = self.analyze_partner_diversification(years)
+        partner_analysis = self._save_year_rows(partner_analysis, "partner_diversification.csv", years, incremental)
+        supplier_tdi = self.analyze_supplier_dependency()
+        self._save_frame(supplier_tdi, "tdi_matrix.csv")
         
         # 3. Sector analysis
         logger.info("\n[3/5] Analyzing strategic sectors...")
-        sector_analysis = self.analyze_strategic_sectors()
-        self._save_csv(sector_analysis, "sector_analysis.csv")
+        sector_years = [y for y in [2019, 2024] if y in years]   # Compare key years
+        sector_analysis = self.analyze_strategic_sectors(sector_years)
+        self._save_year_rows(sector_analysis, "sector_analysis.csv", sector_years, incremental)
+        sector_vulnerability = self.analyze_sector_vulnerability()
+        self._save_frame(sector_vulnerability, "sector_vulnerability.csv", index=False)
         
         # 4. Period comparison
         logger.info("\n[4/5] Comparing baseline vs intervention periods...")
         comparison = self.compare_periods()
         self._save_json(comparison, "period_comparison.json")
+        cpods_pairs = self.analyze_cpods_windows()
+        self._save_frame(cpods_pairs, "cpods_matrix.csv", index=False)
+        product_dmsi = self.analyze_product_substitution()
+        self._save_frame(product_dmsi, "product_dmsi.csv")
+        product_ranking = self.calculator.rank_dmsi(2015, 2022, top=10)
+        trade_balance = self.analyze_trade_balance()
+        self._save_frame(trade_balance, "trade_balance.csv", index=False)
         
         # 5. Generate summary report
         logger.info("\n[5/5] Generating summary report...")
-        self.generate_report(metrics_summary, partner_analysis, comparison)
+        self.generate_report(metrics_summary, partner_analysis, comparison, supplier_tdi,
+                             product_ranking)
+        
+        self._save_state(fingerprints, version)
+        
+        stats = self.calculator.cache_stats()
+        logger.info(f"Metric cache: {stats['hits']} hits, {stats['misses']} misses")
         
         logger.info("\n" + "=" * 80)
         logger.info("ANALYSIS COMPLETE")
         logger.info(f"Results saved to: {self.output_dir}")
         logger.info("=" * 80)
     
-    def analyze_time_series(self) -> List[Dict]:
-        """Calculate all metrics for each year"""
+    def analyze_time_series(self, years: List[int] = None) -> List[Dict]:
+        """Calculate all metrics for each year (default: the whole analysis period)"""
         results = []
         
-        for year in range(self.baseline_start, self.intervention_end + 1):
+        if years is None:
+            years = range(self.baseline_start, self.analysis_end + 1)
+        
+        # All yearly metrics in one batch over shared intermediates
+        metrics = self.calculator.evaluate(['TDI', 'HHI', 'SCRS'], years, partner_iso='CHN')
+        
+        for year in years:
             logger.info(f"  Processing year {year}...")
             
             row = {
                 'Year': year,
-                'Period': 'Baseline' if year <= self.baseline_end else 'Intervention',
-                'TDI_China': self.calculator.calculate_tdi(year, 'CHN'),
-                'HHI': self.calculator.calculate_hhi(year),
-                'SCRS': self.calculator.calculate_scrs(year)
+                'Period': self._period(year),
+                'TDI_China': float(metrics.at[year, 'TDI']),
+                'HHI': float(metrics.at[year, 'HHI']),
+                'SCRS': float(metrics.at[year, 'SCRS'])
             }
 
             results.append(row)
         
         return results
     
-    def analyze_partner_diversification(self) -> List[Dict]:
-        """Analyze trade partner shares over time"""
+    def analyze_partner_diversification(self, years: List[int] = None) -> List[Dict]:
+        """Analyze trade partner shares over time (default: the whole analysis period)"""
         results = []
         
         # Key partners to track
@@ -112,52 +178,85 @@ class DeriskingAnalyzer:
             'SGP': 'Singapore'
         }
         
-        for year in range(self.baseline_start, self.intervention_end + 1):
-            shares = self.calculator._get_partner_shares(year)
-            
+        # Shares of all tracked partners for all years in one selection
+        if years is None:
+            years = range(self.baseline_start, self.analysis_end + 1)
+        shares = self.calculator.tdi_matrix(years, partners.keys())
+        
+        for year in years:
             for iso, name in partners.items():
                 results.append({
                     'Year': year,
                     'Partner_ISO': iso,
                     'Partner_Name': name,
-                    'Import_Share': shares.get(iso, 0.0)
+                    'Import_Share': float(shares.at[year, iso])
                 })
         
         return results
     
-    def analyze_strategic_sectors(self) -> List[Dict]:
+    def analyze_supplier_dependency(self) -> pd.DataFrame:
+        """TDI of every supplier for every year of the analysis period"""
+        years = range(self.baseline_start, self.analysis_end + 1)
+        return self.calculator.tdi_matrix(years)
+    
+    def analyze_strategic_sectors(self, years: List[int] = None) -> List[Dict]:
         """Analyze dependency in strategic sectors"""
         results = []
+        sectors = self.strategic_sectors
+        if years is None:
+            years = [2019, 2024]  # Compare key years
+        if not years:
+            return results
         
-        # Define strategic sectors (HS 2-digit codes)
-        sectors = {
-            '84': {'name': 'Machinery & Mechanical Appliances', 'criticality': 5},
-            '85': {'name': 'Electrical Machinery & Equipment', 'criticality': 5},
-            '29': {'name': 'Organic Chemicals', 'criticality': 4},
-            '30': {'name': 'Pharmaceutical Products', 'criticality': 5},
-            '39': {'name': 'Plastics', 'criticality': 3},
-            '72': {'name': 'Iron & Steel', 'criticality': 4},
-            '90': {'name': 'Optical & Medical Instruments', 'criticality': 4}
-        }
+        # SSVI of all chapters for both years in one batch
+        ssvi = self.calculator.ssvi_matrix(years, criticality=self._criticality_weights())
         
-        for year in [2019, 2024]:  # Compare key years
+        for year in years:
             for code, info in sectors.items():
-                ssvi = self.calculator.calculate_ssvi(
-                    year, 
-                    [code], 
-                    info['criticality']
-                )
-                
                 results.append({
                     'Year': year,
                     'Sector_Code': code,
                     'Sector_Name': info['name'],
                     'Criticality': info['criticality'],
-                    'SSVI': ssvi
+                    'SSVI': float(ssvi.at[year, code]) if code in ssvi.columns else 0.0
                 })
         
         return results
     
+    def analyze_sector_vulnerability(self) -> pd.DataFrame:
+        """
+        China dependency and SSVI of every HS chapter for every year
+        
+        Chapters outside the strategic sectors get criticality 1. Rank 1 is
+        the most vulnerable chapter of the year.
+        """
+        years = range(self.baseline_start, self.analysis_end + 1)
+        share = self.calculator.ssvi_matrix(years)
+        ssvi = self.calculator.ssvi_matrix(years, criticality=self._criticality_weights())
+        
+        table = pd.DataFrame({
+            'China_Share': share.stack(),
+            'SSVI': ssvi.stack()
+        }).reset_index()
+        table['Criticality'] = table['Sector'].map(self._criticality_weights()).fillna(1.0)
+        table['Rank'] = (table.groupby('Year')['SSVI']
+                         .rank(ascending=False, method='first').astype(int))
+        
+        return (table[['Year', 'Sector', 'Criticality', 'China_Share', 'SSVI', 'Rank']]
+                .sort_values(['Year', 'Rank']).reset_index(drop=True))
+    
+    def _period(self, year: int) -> str:
+        """Study period of a year; years after the intervention period are reported separately"""
+        if year <= self.baseline_end:
+            return 'Baseline'
+        if year <= self.intervention_end:
+            return 'Intervention'
+        return 'Post-Intervention'
+    
+    def _criticality_weights(self) -> Dict[str, float]:
+        """Criticality weight of every strategic sector"""
+        return {code: info['criticality'] for code, info in self.strategic_sectors.items()}
+    
     def compare_periods(self) -> Dict:
         """Compare baseline vs intervention periods"""
         baseline_mid = 2015  # Mid-point of baseline
@@ -206,17 +305,80 @@ class DeriskingAnalyzer:
             'improvement': 'Yes' if scrs_intervention > scrs_baseline else 'No'
         }
         
+        # Whole-period averages, less sensitive to a single noisy year
+        comparison['period_averages'] = {}
+        for metric in ['TDI', 'HHI', 'SCRS']:
+            baseline = self.calculator.calculate_window_average(
+                metric, self.baseline_start, self.baseline_end)
+            intervention = self.calculator.calculate_window_average(
+                metric, self.intervention_start, self.intervention_end)
+            comparison['period_averages'][metric] = {
+                'baseline': float(baseline),
+                'intervention': float(intervention),
+                'change': float(intervention - baseline)
+            }
+        
         return comparison
     
+    def analyze_product_substitution(self) -> pd.DataFrame:
+        """
+        DMSI proxy of every product between the period mid-points (2015 → 2022)
+        
+        Each product also gets its 2022 supplier count, supplier HHI and
+        China share (0 for products without 2022 imports), and its
+        substitution rank (1 = largest import reduction). Products without
+        2015 imports are not ranked and are listed last.
+        """
+        table = self.calculator.dmsi_table(2015, 2022)
+        concentration = (self.calculator.product_concentration([2022], partner_iso='CHN')
+                         .droplevel('Year')[['Suppliers', 'HHI', 'Partner_Share']]
+                         .rename(columns={'Partner_Share': 'China_Share'}))
+        table = table.join(concentration).fillna({'Suppliers': 0, 'HHI': 0.0, 'China_Share': 0.0})
+        table['Suppliers'] = table['Suppliers'].astype(int)
+        
+        ranking = self.calculator.rank_dmsi(2015, 2022, top=None)['substituted']
+        rank = pd.Series(np.arange(1, len(ranking) + 1), index=ranking.index)
+        table['Rank'] = rank.reindex(table.index).astype('Int64')
+        return table.sort_values('Rank', na_position='last', kind='stable')
+    
+    def analyze_trade_balance(self) -> pd.DataFrame:
+        """Imports, exports, deficit and TBII (vs 2015) with every partner by year"""
+        table = self.calculator.trade_balance_table().reset_index()
+        table = table[table['Year'].between(self.baseline_start, self.analysis_end)]
+        
+        # TBII of every partner and year against the baseline mid-point
+        tbii = self.calculator.tbii_by_partner(2015).stack()
+        keys = pd.MultiIndex.from_frame(table[['Year', 'Partner']])
+        table['TBII_vs_2015'] = tbii.reindex(keys, fill_value=0.0).to_numpy()
+        return table.reset_index(drop=True)
+    
+    def analyze_cpods_windows(self) -> pd.DataFrame:
+        """CPODS of every baseline/current year pair for each alternative-partner group"""
+        years = range(self.baseline_start, self.analysis_end + 1)
+        groups = {name: COUNTRY_GROUPS[name] for name in ['CPODS_ALTERNATIVES', 'ASEAN', 'QUAD']}
+        
+        matrices = self.calculator.cpods_matrices(groups, years)
+        
+        tables = []
+        for name, matrix in matrices.items():
+            pairs = matrix.stack().rename('CPODS').reset_index()
+            pairs = pairs[pairs['Current_Year'] > pairs['Baseline_Year']]
+            pairs.insert(0, 'Alternative_Set', name)
+            tables.append(pairs)
+        
+        return pd.concat(tables, ignore_index=True)
+    
     def generate_report(self, metrics_summary: List[Dict], 
                        partner_analysis: List[Dict],
-                       comparison: Dict):
+                       comparison: Dict,
+                       supplier_tdi: pd.DataFrame = None,
+                       product_ranking: Dict[str, pd.DataFrame] = None):
         """Generate markdown summary report"""
         report_path = self.output_dir / "analysis_report.md"
         
         with open(report_path, 'w') as f:
             f.write("# India Derisking Analysis Report\n\n")
-            f.write(f"**Analysis Period**: {self.baseline_start}-{self.intervention_end}\n\n")
+            f.write(f"**Analysis Period**: {self.baseline_start}-{self.analysis_end}\n\n")
             f.write(f"**Baseline Period**: {self.baseline_start}-{self.baseline_end}\n\n")
             f.write(f"**Intervention Period**: {self.intervention_start}-{self.intervention_end}\n\n")
             
@@ -253,6 +415,17 @@ class DeriskingAnalyzer:
             f.write(f"- **Change**: {scrs_data['change']:+.2f}\n")
             f.write(f"- **Status**: {'✅ Improved' if scrs_data['improvement'] else '❌ Declined'}\n\n")
             
+            # Period averages
+            averages = comparison.get('period_averages', {})
+            if averages:
+                f.write(f"### Period Averages\n\n")
+                f.write("| Metric | Baseline | Intervention | Change |\n")
+                f.write("|--------|----------|--------------|--------|\n")
+                for metric, values in averages.items():
+                    f.write(f"| {metric} | {values['baseline']:.2f} | "
+                            f"{values['intervention']:.2f} | {values['change']:+.2f} |\n")
+                f.write("\n")
+            
             f.write("---\n\n")
             f.write("## Key Findings\n\n")
             
@@ -266,15 +439,119 @@ class DeriskingAnalyzer:
             for i, partner in enumerate(partners_2024[:10], 1):
                 f.write(f"| {i} | {partner['Partner_Name']} | {partner['Import_Share']:.2f}% |\n")
             
+            # Suppliers whose dependency moved most between the mid-points
+            if supplier_tdi is not None and {2015, 2022} <= set(supplier_tdi.index):
+                change = (supplier_tdi.loc[2022] - supplier_tdi.loc[2015])
+                top = change.reindex(change.abs().sort_values(ascending=False).index)[:10]
+                
+                f.write("\n### Largest Dependency Shifts (2015 → 2022)\n\n")
+                f.write("| Partner | TDI 2015 | TDI 2022 | Change |\n")
+                f.write("|---------|----------|----------|--------|\n")
+                for iso, delta in top.items():
+                    f.write(f"| {iso} | {supplier_tdi.at[2015, iso]:.2f}% | "
+                            f"{supplier_tdi.at[2022, iso]:.2f}% | {delta:+.2f}% |\n")
+            
+            # Products ranked by import substitution between the mid-points
+            if product_ranking is not None:
+                titles = {'substituted': 'Most Substituted Products',
+                          'newly_dependent': 'Newly Dependent Products'}
+                for key, title in titles.items():
+                    f.write(f"\n### {title} (2015 → 2022)\n\n")
+                    f.write("| Rank | Product | Imports 2015 | Imports 2022 | DMSI |\n")
+                    f.write("|------|---------|--------------|--------------|------|\n")
+                    for i, (code, row) in enumerate(product_ranking[key].iterrows(), 1):
+                        f.write(f"| {i} | {code} | {row['Baseline_Imports']:,.0f} | "
+                                f"{row['Current_Imports']:,.0f} | {row['DMSI']:+.2f} |\n")
+            
             f.write("\n---\n\n")
             f.write("## Data Files\n\n")
             f.write("- [metrics_summary.csv](file:///home/owais/projects/derisking/output/derisking_analysis/metrics_summary.csv)\n")
             f.write("- [partner_diversification.csv](file:///home/owais/projects/derisking/output/derisking_analysis/partner_diversification.csv)\n")
             f.write("- [sector_analysis.csv](file:///home/owais/projects/derisking/output/derisking_analysis/sector_analysis.csv)\n")
+            f.write("- [tdi_matrix.csv](file:///home/owais/projects/derisking/output/derisking_analysis/tdi_matrix.csv)\n")
+            f.write("- [sector_vulnerability.csv](file:///home/owais/projects/derisking/output/derisking_analysis/sector_vulnerability.csv)\n")
+            f.write("- [cpods_matrix.csv](file:///home/owais/projects/derisking/output/derisking_analysis/cpods_matrix.csv)\n")
+            f.write("- [product_dmsi.csv](file:///home/owais/projects/derisking/output/derisking_analysis/product_dmsi.csv)\n")
+            f.write("- [trade_balance.csv](file:///home/owais/projects/derisking/output/derisking_analysis/trade_balance.csv)\n")
             f.write("- [period_comparison.json](file:///home/owais/projects/derisking/output/derisking_analysis/period_comparison.json)\n")
         
         logger.info(f"Report generated: {report_path}")
     
+    def _year_fingerprints(self, years: List[int]) -> Dict[str, str]:
+        """Fingerprint of every analysis year's import records"""
+        fingerprints = self.calculator.dataset.import_year_fingerprints()
+        return {str(year): fingerprints.get(year, '') for year in years}
+    
+    def _metric_version(self) -> str:
+        """
+        Version of the code and parameters behind the per-year rows
+        
+        Covers the source of this module and every src module it imports
+        (metrics_calculator, import_cube, metric_registry, ...) plus the
+        analysis periods and sector weights, so rows computed by other
+        code or settings are never merged with new ones.
+        """
+        params = json.dumps({
+            'periods': [self.baseline_start, self.baseline_end,
+                        self.intervention_start, self.intervention_end],
+            'strategic_sectors': self.strategic_sectors
+        }, sort_keys=True)
+        return code_digest(['src.derisking_analyzer']) + ':' + hashlib.sha256(params.encode('utf-8')).hexdigest()
+    
+    def _changed_years(self, fingerprints: Dict[str, str], version: str) -> List[int]:
+        """
+        Years whose input fingerprint differs from the last saved run
+        
+        All years are returned when the last run used a different metric
+        version (or none was recorded).
+        """
+        saved = {}
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, 'r') as f:
+                    saved = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f"Could not read {self.state_path}: {e}; recomputing all years")
+        
+        if saved.get('version') != version:
+            if saved:
+                logger.info("Metric code or parameters changed since the last run; recomputing all years")
+            return [int(year) for year in fingerprints]
+        
+        saved_fingerprints = saved.get('fingerprints', {})
+        return [int(year) for year, digest in fingerprints.items()
+                if saved_fingerprints.get(year) != digest]
+    
+    def _save_state(self, fingerprints: Dict[str, str], version: str):
+        """Record the metric version and input fingerprints behind the saved metric rows"""
+        self._save_json({'version': version, 'fingerprints': fingerprints}, self.state_path.name)
+    
+    def _save_year_rows(self, data: List[Dict], filename: str, years: List[int],
+                        incremental: bool) -> List[Dict]:
+        """
+        Save per-year rows, merging them into the existing file if incremental
+        
+        Rows of the given years replace that year's existing rows; rows of
+        other years are kept.
+        
+        Returns:
+            All rows now in the file
+        """
+        filepath = self.output_dir / filename
+        if not incremental or not filepath.exists():
+            self._save_csv(data, filename)
+            return data
+        
+        existing = pd.read_csv(filepath, dtype={'Sector_Code': str}, float_precision='round_trip')
+        merged = pd.concat(
+            [existing[~existing['Year'].isin(years)], pd.DataFrame(data)],
+            ignore_index=True
+        ).sort_values('Year', kind='stable').to_dict('records')
+        
+        logger.info(f"  Merging {len(data)} rows for {len(years)} years into: {filepath}")
+        self._save_csv(merged, filename)
+        return merged
+    
     def _save_csv(self, data: List[Dict], filename: str):
         """Save data to CSV"""
         if not data:
@@ -289,6 +566,13 @@ class DeriskingAnalyzer:
         
         logger.info(f"  Saved: {filepath}")
     
+    def _save_frame(self, data: pd.DataFrame, filename: str, index: bool = True):
+        """Save DataFrame to CSV"""
+        filepath = self.output_dir / filename
+        data.to_csv(filepath, index=index)
+        
+        logger.info(f"  Saved: {filepath}")
+    
     def _save_json(self, data: Dict, filename: str):
         """Save data to JSON"""
         filepath = self.output_dir / filename
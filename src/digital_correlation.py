@@ -8,15 +8,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+from typing import Union
 import logging
 from scipy import stats
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DigitalCorrelation:
-    def __init__(self, trade_path: str, proxy_path: str, output_dir: str = "output/derisking_analysis"):
-        self.trade_path = Path(trade_path)
+    def __init__(self, trade_path: Union[str, TradeDataset], proxy_path: str, output_dir: str = "output/derisking_analysis"):
+        # Trade data is loaded lazily in run_analysis unless a dataset is given
+        self.trade_path = trade_path
         self.proxy_path = Path(proxy_path)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -30,8 +33,8 @@ class DigitalCorrelation:
         # Note: We need aggregate HS 85 imports (volume) or TDI? The reviewer asks for "Surge in HS 85/84 imports".
         # Let's track Total Import Value of HS 85 from World (Demand) and China (Dependency).
         
-        df_trade = pd.read_csv(self.trade_path)
-        df_trade.columns = df_trade.columns.str.strip()
+        dataset = TradeDataset.coerce(self.trade_path)
+        df_trade = dataset.df
         
         # Filter HS 85 (Electronics) | Reporter=IND or Partner=IND (Export flow)
         # Assuming Data has Partner=IND, Flow=Export for India Imports
@@ -41,9 +44,6 @@ class DigitalCorrelation:
         # 1. Filter: Partner=IND, Flow=Export (Reporters exporting to India)
         # 2. Filter: ProductCode starts with '85'
         
-        # Check ProductCode format. It seems to be 2-digit int or string.
-        # "85" might be int 85.
-        
         hs85_imports = []
         years = range(2014, 2025)
         
@@ -57,15 +57,12 @@ class DigitalCorrelation:
                 (df_trade['Year'] == y)
             ]
             
-            # Filter product 85
-            # Product codes can be mixed. We saw '85' in prev turns.
-            # Safe way: convert to string and check
-            
-            tech_subset = subset[subset['ProductCode'].astype(str) == '85']
+            # Filter product 85 via the shared HS prefix index
+            tech_subset = subset[dataset.hs_mask(['85'], subset)]
             val = tech_subset['TradeValue in 1000 USD'].sum()
             
             # Also get HS 84
-            mech_subset = subset[subset['ProductCode'].astype(str) == '84']
+            mech_subset = subset[dataset.hs_mask(['84'], subset)]
             val_84 = mech_subset['TradeValue in 1000 USD'].sum()
             
             hs85_imports.append({
@@ -123,9 +120,9 @@ class DigitalCorrelation:
         plt.savefig(self.figures_dir / 'figure10_digital_correlation.png', dpi=300)
         logger.info("Saved Figure 10")
 
-def main():
+def main(data_path: Union[str, TradeDataset] = 'data/merged/consolidated_trade_data.csv'):
     analyzer = DigitalCorrelation(
-        'data/merged/consolidated_trade_data.csv',
+        data_path,
         'data/external/digital_subscribers_proxy.csv'
     )
     analyzer.run_analysis()
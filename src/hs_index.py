@@ -0,0 +1,100 @@
+"""
+HS Index Module
+Prefix index over the HS hierarchy (chapter / heading / subheading) of
+normalized ProductCode categories
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List
+from src.trade_schema import normalize_hs_code
+
+
+class HSIndex:
+    """
+    Resolve baskets of HS prefixes to product categories and row masks
+
+    Built over the categories of a normalized, categorical ProductCode
+    column (see src.trade_schema). Every category is registered under its
+    2-, 4- and 6-digit prefixes, so a prefix resolves to its matching
+    categories with a dictionary lookup; a row mask is then a single
+    gather over the integer category codes, with no string operations.
+    """
+
+    LEVELS = (2, 4, 6)
+
+    def __init__(self, categories: pd.Index):
+        """
+        Build the prefix index
+
+        Args:
+            categories: Normalized ProductCode categories
+        """
+        self.categories = pd.Index(categories)
+        self.prefixes: Dict[int, Dict[str, List[int]]] = {level: {} for level in self.LEVELS}
+
+        for position, code in enumerate(self.categories):
+            code = str(code)
+            for level in self.LEVELS:
+                if len(code) >= level:
+                    self.prefixes[level].setdefault(code[:level], []).append(position)
+
+    @classmethod
+    def from_series(cls, product_codes: pd.Series) -> 'HSIndex':
+        """Build the index for a categorical ProductCode column"""
+        return cls(product_codes.cat.categories)
+
+    def category_positions(self, prefixes: Iterable) -> np.ndarray:
+        """
+        Categories matching any of the HS prefixes
+
+        Numeric codes are normalized like the data (7 -> '07'); string
+        prefixes are matched as written, so '851' selects headings 8510-8519.
+
+        Args:
+            prefixes: HS codes or prefixes, e.g. ['85'] or ['29', '3004']
+
+        Returns:
+            Sorted array of category positions
+        """
+        positions = set()
+        for prefix in prefixes:
+            if isinstance(prefix, str):
+                prefix = prefix.strip()
+            else:
+                prefix = normalize_hs_code(prefix)
+            level_index = self.prefixes.get(len(prefix))
+            if level_index is not None:
+                positions.update(level_index.get(prefix, ()))
+            else:
+                # Uncommon prefix length: fall back to scanning the categories
+                positions.update(
+                    i for i, code in enumerate(self.categories) if str(code).startswith(prefix)
+                )
+        return np.array(sorted(positions), dtype=np.int64)
+
+    def codes(self, prefixes: Iterable) -> List[str]:
+        """Product codes matching any of the HS prefixes"""
+        return [str(self.categories[i]) for i in self.category_positions(prefixes)]
+
+    def mask(self, product_codes: pd.Series, prefixes: Iterable) -> np.ndarray:
+        """
+        Boolean row mask of records whose ProductCode matches any prefix
+
+        Args:
+            product_codes: Categorical ProductCode column
+            prefixes: HS codes or prefixes
+
+        Returns:
+            Boolean array aligned with product_codes
+        """
+        if not isinstance(product_codes.dtype, pd.CategoricalDtype):
+            product_codes = product_codes.map(normalize_hs_code).astype('category')
+
+        if not product_codes.cat.categories.equals(self.categories):
+            return HSIndex.from_series(product_codes).mask(product_codes, prefixes)
+
+        # Extra trailing False so that missing codes (-1) never match
+        lookup = np.zeros(len(self.categories) + 1, dtype=bool)
+        lookup[self.category_positions(prefixes)] = True
+        return lookup[product_codes.cat.codes.to_numpy()]
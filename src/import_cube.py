@@ -0,0 +1,109 @@
+"""
+Import Cube Module
+Year × Partner totals of India's imports and the shares and HHI derived
+from them, the core data structure of the metric engine
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+import logging
+from src.profiler import count_rows
+from src.reference_data import region_ids
+from src.trade_schema import encode_column
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ImportCube:
+    """
+    India's import values by year and partner
+
+    partner_totals[y, p] is the trade value (1000 USD) India imported in
+    year years[y] from partner partners[p]. Axes only contain labels that
+    occur in the data. Per-product reductions live in SparseImports, which
+    scales with the number of non-zero (year, product, partner) flows.
+    """
+
+    def __init__(self, imports: pd.DataFrame):
+        """
+        Build the cube from India's import records
+
+        Args:
+            imports: Import records (Year, ReporterISO3, ProductCode and
+                TradeValue in 1000 USD columns)
+        """
+        count_rows(len(imports))
+
+        # Records without a year, partner or product cannot be placed
+        imports = imports.dropna(subset=['Year', 'ReporterISO3', 'ProductCode'])
+
+        self.years, year_codes = encode_column(imports['Year'])
+        self.partners, partner_codes = encode_column(imports['ReporterISO3'])
+
+        self.years = self.years.astype(int)
+        self.partners = self.partners.astype(str)
+
+        n_years, n_partners = len(self.years), len(self.partners)
+        year_partner = year_codes.astype(np.int64) * n_partners + partner_codes
+
+        # Missing trade values count as records but add nothing
+        trade_values = imports['TradeValue in 1000 USD'].fillna(0.0).to_numpy(dtype=np.float64)
+
+        # Label lookups
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+        self.partner_index = {partner: i for i, partner in enumerate(self.partners)}
+
+        # Region of every partner (-1: unknown)
+        self.partner_regions = region_ids(self.partners)
+
+        # Reductions shared by most metrics
+        self.partner_totals = np.bincount(                              # Year × Partner
+            year_partner, weights=trade_values, minlength=n_years * n_partners
+        ).reshape(n_years, n_partners)
+        self.year_totals = self.partner_totals.sum(axis=1)             # Year
+        self.partner_present = np.bincount(                             # Year × Partner
+            year_partner, minlength=n_years * n_partners
+        ).reshape(n_years, n_partners) > 0
+
+        # Import shares (%) of every partner in every year and the yearly
+        # HHI, in one pass over the Year × Partner totals
+        totals = self.year_totals[:, None]
+        self.partner_share_matrix = np.divide(
+            self.partner_totals, totals,
+            out=np.zeros_like(self.partner_totals), where=totals > 0
+        ) * 100
+        self.hhi = (self.partner_share_matrix ** 2).sum(axis=1)      # Year
+
+        logger.info(f"Import cube built: {n_years} years × {n_partners} partners")
+
+    @property
+    def shape(self):
+        return self.partner_totals.shape
+
+    def year_pos(self, year: int) -> Optional[int]:
+        """Axis position of a year (None if absent)"""
+        return self.year_index.get(int(year))
+
+    def partner_pos(self, partner_iso: str) -> Optional[int]:
+        """Axis position of a partner ISO3 code (None if absent)"""
+        return self.partner_index.get(partner_iso)
+
+    def partner_shares(self, year: int) -> Dict[str, float]:
+        """
+        Import share (%) of every partner with records in a year
+
+        Args:
+            year: Year to calculate
+
+        Returns:
+            Dictionary mapping partner ISO3 to share (empty if no imports)
+        """
+        y = self.year_pos(year)
+        if y is None or self.year_totals[y] == 0:
+            return {}
+
+        present = np.flatnonzero(self.partner_present[y])
+        shares = self.partner_share_matrix[y, present]
+        return dict(zip(self.partners[present].tolist(), shares.tolist()))
@@ -0,0 +1,134 @@
+"""
+Metric Cache Module
+Per-instance LRU memoization of metric results
+"""
+
+import functools
+import inspect
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping, Set
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Hashable
+
+
+def _freeze(value) -> Hashable:
+    """Turn a metric argument into a hashable cache-key part"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, Mapping):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, Set):
+        return tuple(sorted(_freeze(v) for v in value))
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if hasattr(value, '__iter__'):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _copy_result(value):
+    """
+    Copy the mutable parts of a metric result
+
+    DataFrames, Series and arrays are copied, dicts, lists and tuples are
+    rebuilt around copies of their items; scalars and other objects are
+    returned as they are.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy_result(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_result(v) for v in value]
+    if isinstance(value, tuple) and not hasattr(value, '_fields'):
+        return tuple(_copy_result(v) for v in value)
+    return value
+
+
+class MetricCache:
+    """
+    Least-recently-used cache of metric results
+
+    Keys are (metric, arguments) tuples. Every call returns its own copy
+    of a cached DataFrame, Series, array, dict or list, so a caller that
+    modifies a result does not change what later calls get. Other objects
+    (e.g. WindowAverages) are shared and must not be modified.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialize an empty cache
+
+        Args:
+            maxsize: Maximum number of results kept
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for key, computing and storing it on a miss
+
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the result
+
+        Returns:
+            Metric result (a copy of the stored one, see _copy_result)
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return _copy_result(self._entries[key])
+
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return _copy_result(value)
+
+    def invalidate(self):
+        """Drop all cached results (counters are kept)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+def cached_metric(method: Callable) -> Callable:
+    """
+    Memoize a metric method in its instance's MetricCache (self.cache)
+
+    Arguments are bound to the method signature with defaults applied, so
+    calculate_tdi(2015) and calculate_tdi(2015, 'CHN') share one entry.
+    """
+    signature = inspect.signature(method)
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+
+        # One-shot iterators are materialized so the key and the call see the same values
+        for param, value in bound.arguments.items():
+            if isinstance(value, Iterator):
+                bound.arguments[param] = list(value)
+
+        key = (name,) + tuple(
+            (param, _freeze(value))
+            for param, value in bound.arguments.items() if param != 'self'
+        )
+        return self.cache.get_or_compute(key, lambda: method(*bound.args, **bound.kwargs))
+
+    return wrapper
@@ -0,0 +1,216 @@
+"""
+Metric Registry Module
+Plug-in registry of yearly metrics and the shared intermediates they derive from
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import logging
+from src.reference_data import aggregate_by_region
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# name -> (builder, required intermediates); builder(calculator, inputs) -> value
+INTERMEDIATES: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+
+# name -> (function, required intermediates); function(inputs, **params) -> array over cube years
+METRICS: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+
+
+def register_intermediate(name: str, requires: Iterable[str] = ()):
+    """
+    Register a shared intermediate
+
+    The decorated function receives the DeriskingMetrics instance and a
+    dictionary of its required intermediates.
+    """
+    def decorator(func: Callable) -> Callable:
+        INTERMEDIATES[name] = (func, tuple(requires))
+        return func
+    return decorator
+
+
+def register_metric(name: str, requires: Iterable[str]):
+    """
+    Register a yearly metric
+
+    The decorated function receives a dictionary of its required
+    intermediates plus the evaluation parameters as keyword arguments, and
+    returns one value per year of the import cube. Metrics only read
+    intermediates, so adding one costs no extra scan of the data.
+    """
+    def decorator(func: Callable) -> Callable:
+        METRICS[name] = (func, tuple(requires))
+        return func
+    return decorator
+
+
+# ============================================================================
+# Shared intermediates
+# ============================================================================
+
+@register_intermediate('cube')
+def _cube(calculator, inputs):
+    """Year × Partner import totals, shares and HHI (one scan of the records)"""
+    return calculator.cube
+
+
+@register_intermediate('partner_shares', requires=['cube'])
+def _partner_shares(calculator, inputs):
+    """Year × Partner import shares (%)"""
+    return inputs['cube'].partner_share_matrix
+
+
+@register_intermediate('hhi', requires=['cube'])
+def _hhi(calculator, inputs):
+    """Yearly HHI (0-10000) of the partner shares"""
+    return inputs['cube'].hhi
+
+
+@register_intermediate('region_totals', requires=['cube'])
+def _region_totals(calculator, inputs):
+    """Year × Region import totals"""
+    cube = inputs['cube']
+    return aggregate_by_region(cube.partner_totals, cube.partner_regions)
+
+
+@register_intermediate('sparse')
+def _sparse(calculator, inputs):
+    """Sparse (year, product, partner) cells, for per-product intermediates"""
+    return calculator.sparse
+
+
+@register_intermediate('product_suppliers', requires=['sparse'])
+def _product_suppliers(calculator, inputs):
+    """Year × Product number of partners with records"""
+    return inputs['sparse'].product_suppliers
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+@register_metric('TDI', requires=['cube', 'partner_shares'])
+def _tdi(inputs, partner_iso: str = 'CHN', **params):
+    """Trade Dependency Index of one partner (%)"""
+    p = inputs['cube'].partner_pos(partner_iso)
+    shares = inputs['partner_shares']
+    return shares[:, p] if p is not None else np.zeros(len(shares))
+
+
+@register_metric('HHI', requires=['hhi'])
+def _hhi_metric(inputs, **params):
+    """Herfindahl-Hirschman Index of import partners"""
+    return inputs['hhi']
+
+
+@register_metric('Source_Diversity', requires=['hhi'])
+def _source_diversity(inputs, max_sources: int = 20, **params):
+    """Effective number of suppliers (inverse HHI) scaled to 0-100"""
+    hhi = inputs['hhi'] / 100 ** 2
+    effective_sources = np.divide(1, hhi, out=np.zeros_like(hhi), where=hhi > 0)
+    return np.minimum(effective_sources / max_sources * 100, 100)
+
+
+@register_metric('Geographic_Diversity', requires=['region_totals'])
+def _geographic_diversity(inputs, max_regions: int = 7, **params):
+    """Simpson index over regional import totals scaled to 0-100"""
+    region_totals = inputs['region_totals']
+    total = region_totals.sum(axis=1, keepdims=True)
+    region_shares = np.divide(region_totals, total,
+                              out=np.zeros_like(region_totals), where=total > 0)
+    simpson = 1 - (region_shares ** 2).sum(axis=1)
+    return np.where(total[:, 0] > 0, np.minimum(simpson / (1 - 1 / max_regions) * 100, 100), 0.0)
+
+
+@register_metric('Critical_Redundancy', requires=['product_suppliers'])
+def _critical_redundancy(inputs, **params):
+    """Average number of suppliers per imported product scaled to 0-100"""
+    suppliers = inputs['product_suppliers']
+    products = (suppliers > 0).sum(axis=1)
+    avg_suppliers = np.divide(suppliers.sum(axis=1), products,
+                              out=np.zeros(len(suppliers)), where=products > 0)
+    return np.minimum(avg_suppliers / 10 * 100, 100)
+
+
+@register_metric('SCRS', requires=['hhi', 'region_totals', 'product_suppliers'])
+def _scrs(inputs, w1: float = 0.4, w2: float = 0.3, w3: float = 0.3, **params):
+    """Supply Chain Resilience Score"""
+    return (w1 * _source_diversity(inputs, **params) +
+            w2 * _geographic_diversity(inputs, **params) +
+            w3 * _critical_redundancy(inputs, **params))
+
+
+# ============================================================================
+# Evaluator
+# ============================================================================
+
+class MetricEvaluator:
+    """
+    Evaluate a batch of registered metrics over all years
+
+    Resolves the intermediates the requested metrics need (including their
+    own requirements), computes each of them once for the batch and feeds
+    them to every dependent metric.
+    """
+
+    def __init__(self, calculator):
+        """
+        Initialize evaluator
+
+        Args:
+            calculator: DeriskingMetrics instance providing the data
+        """
+        self.calculator = calculator
+
+    def _resolve(self, name: str, inputs: Dict[str, Any]):
+        """Compute an intermediate and its requirements, each once"""
+        if name in inputs:
+            return
+        if name not in INTERMEDIATES:
+            raise KeyError(f"Unknown intermediate: {name}")
+
+        builder, requires = INTERMEDIATES[name]
+        for requirement in requires:
+            self._resolve(requirement, inputs)
+        inputs[name] = builder(self.calculator, {r: inputs[r] for r in requires})
+
+    def evaluate(self, metrics: List[str], years: Iterable[int] = None,
+                 **params) -> pd.DataFrame:
+        """
+        Evaluate metrics for every year
+
+        Args:
+            metrics: Registered metric names, e.g. ['TDI', 'HHI', 'SCRS']
+            years: Years to include (default: all years with imports);
+                years without imports get 0
+            **params: Metric parameters, e.g. partner_iso='CHN', w1=0.5
+
+        Returns:
+            DataFrame indexed by Year with one column per metric
+        """
+        unknown = [name for name in metrics if name not in METRICS]
+        if unknown:
+            raise KeyError(f"Unknown metrics: {unknown} (registered: {sorted(METRICS)})")
+
+        # Shared intermediates of the whole batch, each computed once
+        inputs: Dict[str, Any] = {}
+        self._resolve('cube', inputs)
+        for name in metrics:
+            for requirement in METRICS[name][1]:
+                self._resolve(requirement, inputs)
+
+        cube = inputs['cube']
+        table = pd.DataFrame(
+            {name: METRICS[name][0](inputs, **params) for name in metrics},
+            index=pd.Index(cube.years, name='Year')
+        )
+
+        logger.info(f"Evaluated {len(metrics)} metrics from {len(inputs)} shared intermediates")
+
+        if years is not None:
+            table = table.reindex(pd.Index([int(y) for y in years], name='Year'), fill_value=0.0)
+        return table
@@ -3,11 +3,19 @@ Metrics Calculator Module
 Implements 7 metrics to measure India's derisking effectiveness
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from collections import defaultdict
 import logging
+from src.import_cube import ImportCube
+from src.metric_cache import MetricCache, cached_metric
+from src.metric_registry import MetricEvaluator
+from src.sparse_imports import SparseImports
+from src.window_metrics import WindowAverages
+from src.reference_data import COUNTRY_GROUPS, COUNTRY_TO_REGION
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,116 +28,39 @@ class DeriskingMetrics:
     Calculate derisking metrics for India's trade data
     """
     
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: Union[str, TradeDataset]):
         """
         Initialize with consolidated trade data
         
         Args:
-            data_path: Path to consolidated CSV file
+            data_path: Path to consolidated CSV file or TradeStore directory,
+                or an already loaded TradeDataset
         """
-        self.data_path = Path(data_path)
-        self.df = self._load_data()
-
-        self.country_to_region = {
-                # --- SOUTH ASIA ---
-                "AFG": "South Asia", "BGD": "South Asia", "BTN": "South Asia", "IND": "South Asia",
-                "MDV": "South Asia", "NPL": "South Asia", "PAK": "South Asia", "LKA": "South Asia",
-
-                # --- EAST ASIA & PACIFIC ---
-                "ASM": "East Asia & Pacific", "AUS": "East Asia & Pacific", "BRN": "East Asia & Pacific",
-                "KHM": "East Asia & Pacific", "CHN": "East Asia & Pacific", "CXR": "East Asia & Pacific",
-                "CCK": "East Asia & Pacific", "COK": "East Asia & Pacific", "FJI": "East Asia & Pacific",
-                "PYF": "East Asia & Pacific", "GUM": "East Asia & Pacific", "HKG": "East Asia & Pacific",
-                "IDN": "East Asia & Pacific", "JPN": "East Asia & Pacific", "KIR": "East Asia & Pacific",
-                "PRK": "East Asia & Pacific", "KOR": "East Asia & Pacific", "LAO": "East Asia & Pacific",
-                "MAC": "East Asia & Pacific", "MYS": "East Asia & Pacific", "MHL": "East Asia & Pacific",
-                "FSM": "East Asia & Pacific", "MNG": "East Asia & Pacific", "MMR": "East Asia & Pacific",
-                "NRU": "East Asia & Pacific", "NCL": "East Asia & Pacific", "NZL": "East Asia & Pacific",
-                "NIU": "East Asia & Pacific", "NFK": "East Asia & Pacific", "MNP": "East Asia & Pacific",
-                "PLW": "East Asia & Pacific", "PNG": "East Asia & Pacific", "PHL": "East Asia & Pacific",
-                "PCN": "East Asia & Pacific", "WSM": "East Asia & Pacific", "SGP": "East Asia & Pacific",
-                "SLB": "East Asia & Pacific", "TWN": "East Asia & Pacific", "THA": "East Asia & Pacific",
-                "TLS": "East Asia & Pacific", "TKL": "East Asia & Pacific", "TON": "East Asia & Pacific",
-                "TUV": "East Asia & Pacific", "VUT": "East Asia & Pacific", "VNM": "East Asia & Pacific",
-                "WLF": "East Asia & Pacific",
-
-                # --- EUROPE ---
-                "ALB": "Europe", "AND": "Europe", "AUT": "Europe", "BEL": "Europe", "BIH": "Europe",
-                "BGR": "Europe", "HRV": "Europe", "CYP": "Europe", "CZE": "Europe", "DNK": "Europe",
-                "EST": "Europe", "FRO": "Europe", "FIN": "Europe", "FRA": "Europe", "DEU": "Europe",
-                "GIB": "Europe", "GRC": "Europe", "GGY": "Europe", "VAT": "Europe", "HUN": "Europe",
-                "ISL": "Europe", "IRL": "Europe", "IMN": "Europe", "ITA": "Europe", "JEY": "Europe",
-                "LVA": "Europe", "LIE": "Europe", "LTU": "Europe", "LUX": "Europe", "MLT": "Europe",
-                "MDA": "Europe", "MCO": "Europe", "MNE": "Europe", "NLD": "Europe", "MKD": "Europe",
-                "NOR": "Europe", "POL": "Europe", "PRT": "Europe", "ROU": "Europe", "SMR": "Europe",
-                "SRB": "Europe", "SVK": "Europe", "SVN": "Europe", "ESP": "Europe", "SJM": "Europe",
-                "SWE": "Europe", "CHE": "Europe", "UKR": "Europe", "GBR": "Europe", "ALA": "Europe",
-
-                # --- AMERICAS ---
-                "AIA": "Americas", "ATG": "Americas", "ARG": "Americas", "ABW": "Americas",
-                "BHS": "Americas", "BRB": "Americas", "BLZ": "Americas", "BMU": "Americas",
-                "BOL": "Americas", "BES": "Americas", "BRA": "Americas", "VGB": "Americas",
-                "CAN": "Americas", "CYM": "Americas", "CHL": "Americas", "COL": "Americas",
-                "CRI": "Americas", "CUB": "Americas", "CUW": "Americas", "DMA": "Americas",
-                "DOM": "Americas", "ECU": "Americas", "SLV": "Americas", "FLK": "Americas",
-                "GUF": "Americas", "GRL": "Americas", "GRD": "Americas", "GLP": "Americas",
-                "GTM": "Americas", "GUY": "Americas", "HTI": "Americas", "HND": "Americas",
-                "JAM": "Americas", "MTQ": "Americas", "MEX": "Americas", "MSR": "Americas",
-                "NIC": "Americas", "PAN": "Americas", "PRY": "Americas", "PER": "Americas",
-                "PRI": "Americas", "BLM": "Americas", "KNA": "Americas", "LCA": "Americas",
-                "MAF": "Americas", "SPM": "Americas", "VCT": "Americas", "SXM": "Americas",
-                "SUR": "Americas", "TTO": "Americas", "TCA": "Americas", "USA": "Americas",
-                "URY": "Americas", "VEN": "Americas", "VIR": "Americas",
-
-                # --- MENA (Middle East & North Africa) ---
-                "DZA": "MENA", "BHR": "MENA", "EGY": "MENA", "IRN": "MENA", "IRQ": "MENA",
-                "ISR": "MENA", "JOR": "MENA", "KWT": "MENA", "LBN": "MENA", "LBY": "MENA",
-                "MAR": "MENA", "OMN": "MENA", "PSE": "MENA", "QAT": "MENA", "SAU": "MENA",
-                "SYR": "MENA", "TUN": "MENA", "TUR": "MENA", "ARE": "MENA", "YEM": "MENA",
-
-                # --- SUB-SAHARAN AFRICA ---
-                "AGO": "Sub-Saharan Africa", "BEN": "Sub-Saharan Africa", "BWA": "Sub-Saharan Africa",
-                "BFA": "Sub-Saharan Africa", "BDI": "Sub-Saharan Africa", "CPV": "Sub-Saharan Africa",
-                "CMR": "Sub-Saharan Africa", "CAF": "Sub-Saharan Africa", "TCD": "Sub-Saharan Africa",
-                "COM": "Sub-Saharan Africa", "COG": "Sub-Saharan Africa", "COD": "Sub-Saharan Africa",
-                "CIV": "Sub-Saharan Africa", "DJI": "Sub-Saharan Africa", "GNQ": "Sub-Saharan Africa",
-                "ERI": "Sub-Saharan Africa", "SWZ": "Sub-Saharan Africa", "ETH": "Sub-Saharan Africa",
-                "GAB": "Sub-Saharan Africa", "GMB": "Sub-Saharan Africa", "GHA": "Sub-Saharan Africa",
-                "GIN": "Sub-Saharan Africa", "GNB": "Sub-Saharan Africa", "KEN": "Sub-Saharan Africa",
-                "LSO": "Sub-Saharan Africa", "LBR": "Sub-Saharan Africa", "MDG": "Sub-Saharan Africa",
-                "MWI": "Sub-Saharan Africa", "MLI": "Sub-Saharan Africa", "MRT": "Sub-Saharan Africa",
-                "MUS": "Sub-Saharan Africa", "MYT": "Sub-Saharan Africa", "MOZ": "Sub-Saharan Africa",
-                "NAM": "Sub-Saharan Africa", "NER": "Sub-Saharan Africa", "NGA": "Sub-Saharan Africa",
-                "REU": "Sub-Saharan Africa", "RWA": "Sub-Saharan Africa", "SHN": "Sub-Saharan Africa",
-                "STP": "Sub-Saharan Africa", "SEN": "Sub-Saharan Africa", "SYC": "Sub-Saharan Africa",
-                "SLE": "Sub-Saharan Africa", "SOM": "Sub-Saharan Africa", "ZAF": "Sub-Saharan Africa",
-                "SSD": "Sub-Saharan Africa", "SDN": "Sub-Saharan Africa", "TZA": "Sub-Saharan Africa",
-                "TGO": "Sub-Saharan Africa", "UGA": "Sub-Saharan Africa", "ZMB": "Sub-Saharan Africa",
-                "ZWE": "Sub-Saharan Africa",
-
-                # --- RUSSIA & CENTRAL ASIA ---
-                "ARM": "Russia & Central Asia", "AZE": "Russia & Central Asia", "BLR": "Russia & Central Asia",
-                "GEO": "Russia & Central Asia", "KAZ": "Russia & Central Asia", "KGZ": "Russia & Central Asia",
-                "RUS": "Russia & Central Asia", "TJK": "Russia & Central Asia", "TKM": "Russia & Central Asia",
-                "UZB": "Russia & Central Asia",
+        self.dataset = TradeDataset.coerce(data_path)
+        self.data_path = self.dataset.data_path
+        self.df = self.dataset.df
+        self._cube = None
+        self._sparse = None
+        
+        # Memoized metric results, dropped whenever the dataset changes
+        self.cache = MetricCache()
+        self.dataset.add_change_listener(self.invalidate)
+        
+        # Registered yearly metrics (see src.metric_registry)
+        self.evaluator = MetricEvaluator(self)
 
-                # --- ANTARCTIC / OTHER ---
-                "ATA": "Antarctic", "BVT": "Antarctic", "HMD": "Antarctic", "ATF": "Antarctic",
-                "SGS": "Antarctic", "UMI": "Americas" # US Minor Outlying Islands
-            }
+        # Shared reference table (see src.reference_data), not rebuilt per instance
+        self.country_to_region = COUNTRY_TO_REGION
         logger.info(f"Loaded {len(self.df)} trade records")
     
-    def _load_data(self) -> pd.DataFrame:
-        """Load and parse trade data using pandas"""
-        df = pd.read_csv(self.data_path)
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        return df
-    
     def _filter_india_imports(self, year: int = None) -> pd.DataFrame:
         """
         Filter data for India's imports
         
+        Served from the dataset's precomputed imports view, which is sorted
+        by year, so selecting a year is a slice rather than a full scan.
+        The result is not a copy: do not modify it.
+        
         Args:
             year: Optional year filter
             
@@ -138,12 +69,79 @@ class DeriskingMetrics:
         """
         # India as partner, TradeFlowName = Export means reporter is exporting TO India
         # This is equivalent to India importing FROM reporter
-        mask = (self.df['PartnerISO3'] == 'IND') & (self.df['TradeFlowName'] == 'Export')
+        if year is None:
+            return self.dataset.india_imports
         
-        if year is not None:
-            mask = mask & (self.df['Year'] == year)
+        return self.dataset.india_imports_for_year(year)
+    
+    def invalidate(self):
+        """Drop cached metrics and derived structures (call after the data changed)"""
+        self.df = self.dataset.df
+        self._cube = None
+        self._sparse = None
+        self.cache.invalidate()
+        logger.info("Metric cache invalidated")
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Metric cache hit/miss counters"""
+        return self.cache.stats()
+    
+    @property
+    def cube(self) -> ImportCube:
+        """Year × Partner import cube, built on first use"""
+        if self._cube is None:
+            self._cube = ImportCube(self._filter_india_imports())
+        return self._cube
+    
+    @cached_metric
+    def evaluate(self, metrics: List[str], years: Iterable[int] = None,
+                 **params) -> pd.DataFrame:
+        """
+        Evaluate registered yearly metrics in one batch
         
-        return self.df[mask].copy()
+        Intermediates shared by the metrics (partner shares, region
+        totals, product supplier counts, ...) are computed once.
+        
+        Args:
+            metrics: Registered metric names, e.g. ['TDI', 'HHI', 'SCRS']
+            years: Years to include (default: all years with imports)
+            **params: Metric parameters, e.g. partner_iso='CHN'
+            
+        Returns:
+            DataFrame indexed by Year with one column per metric
+        """
+        return self.evaluator.evaluate(metrics, years, **params)
+    
+    @property
+    def sparse(self) -> SparseImports:
+        """Sparse (product, partner) imports per year, built on first use"""
+        if self._sparse is None:
+            self._sparse = SparseImports(self._filter_india_imports())
+        return self._sparse
+    
+    @cached_metric
+    def product_concentration(self, years: Iterable[int] = None,
+                              partner_iso: str = 'CHN') -> pd.DataFrame:
+        """
+        Per-product HHI, supplier count and partner share for every year
+        
+        Computed with segment reductions over the sparse import
+        representation, so it scales with the number of non-zero flows and
+        suits HS6-level data.
+        
+        Args:
+            years: Years to include (default: all years with imports)
+            partner_iso: Partner whose share is reported (default: CHN)
+            
+        Returns:
+            DataFrame indexed by (Year, ProductCode) with Total_Imports,
+            Suppliers, HHI and Partner_Share columns
+        """
+        stats = self.sparse.product_stats(partner_iso)
+        if years is not None:
+            years = [int(y) for y in years]
+            stats = stats[stats.index.get_level_values('Year').isin(years)]
+        return stats
     
     def _get_trade_value(self, value) -> float:
         """Extract trade value"""
@@ -156,6 +154,7 @@ class DeriskingMetrics:
     # METRIC 1: Trade Dependency Index (TDI)
     # ========================================================================
     
+    @cached_metric
     def calculate_tdi(self, year: int, partner_iso: str = 'CHN') -> float:
         """
         Calculate Trade Dependency Index for a specific partner
@@ -169,23 +168,24 @@ class DeriskingMetrics:
         Returns:
             TDI percentage
         """
-        imports_df = self._filter_india_imports(year)
-
+        cube = self.cube
+        y = cube.year_pos(year)
         
+        if y is None or cube.year_totals[y] == 0:
+            return 0.0
         
         # Total imports (sum of all trade values)
-        total_imports = imports_df['TradeValue in 1000 USD'].sum()
+        total_imports = cube.year_totals[y]
         
         # Imports from specific partner
-        partner_imports = imports_df[imports_df['ReporterISO3'] == partner_iso]['TradeValue in 1000 USD'].sum()
-        
-        if total_imports == 0:
-            return 0.0
+        p = cube.partner_pos(partner_iso)
+        partner_imports = cube.partner_totals[y, p] if p is not None else 0.0
         
         tdi = (partner_imports / total_imports) * 100
         logger.info(f"TDI ({partner_iso}, {year}): {tdi:.2f}%")
         return tdi
     
+    @cached_metric
     def calculate_tdi_trend(self, start_year: int, end_year: int, 
                            partner_iso: str = 'CHN') -> Dict[int, float]:
         """
@@ -199,15 +199,46 @@ class DeriskingMetrics:
         Returns:
             Dictionary mapping year to TDI
         """
-        trend = {}
-        for year in range(start_year, end_year + 1):
-            trend[year] = self.calculate_tdi(year, partner_iso)
-        return trend
+        tdi = self.tdi_matrix(range(start_year, end_year + 1), [partner_iso])[partner_iso]
+        return {int(year): float(value) for year, value in tdi.items()}
+    
+    @cached_metric
+    def tdi_matrix(self, years: Iterable[int] = None,
+                   partners: Iterable[str] = None) -> pd.DataFrame:
+        """
+        Calculate TDI for many years and partners at once
+        
+        A selection from the cube's Year × Partner share matrix; years
+        without imports and partners without records get 0.
+        
+        Args:
+            years: Years to include (default: all years with imports)
+            partners: Partner ISO3 codes to include (default: all partners)
+            
+        Returns:
+            DataFrame of TDI percentages indexed by Year with one column
+            per partner
+        """
+        cube = self.cube
+        years = cube.years.tolist() if years is None else [int(y) for y in years]
+        partners = cube.partners.tolist() if partners is None else list(partners)
+        
+        # Pad with a zero row / column for years and partners not in the cube
+        shares = np.pad(cube.partner_share_matrix, ((0, 1), (0, 1)))
+        year_pos = [cube.year_index.get(y, -1) for y in years]
+        partner_pos = [cube.partner_index.get(p, -1) for p in partners]
+        
+        return pd.DataFrame(
+            shares[np.ix_(year_pos, partner_pos)],
+            index=pd.Index(years, name='Year'),
+            columns=pd.Index(partners, name='Partner')
+        )
     
     # ========================================================================
     # METRIC 2: Herfindahl-Hirschman Index (HHI)
     # ========================================================================
     
+    @cached_metric
     def calculate_hhi(self, year: int) -> float:
         """
         Calculate Herfindahl-Hirschman Index for trade concentration
@@ -220,33 +251,33 @@ class DeriskingMetrics:
         Returns:
             HHI value (0-10000)
         """
-        imports_df = self._filter_india_imports(year)
+        cube = self.cube
+        y = cube.year_pos(year)
         
-        # Calculate total imports by partner
-        partner_imports = imports_df.groupby('ReporterISO3')['TradeValue in 1000 USD'].sum()
-        total_imports = partner_imports.sum()
-        
-        if total_imports == 0:
+        if y is None or cube.year_totals[y] == 0:
             return 0.0
         
-        # Calculate market shares and HHI
-        shares = (partner_imports / total_imports) * 100
-        hhi = (shares ** 2).sum()
+        # Market shares and HHI of every year are precomputed by the cube
+        hhi = float(cube.hhi[y])
         
         logger.info(f"HHI ({year}): {hhi:.2f}")
         return hhi
     
+    @cached_metric
     def calculate_hhi_trend(self, start_year: int, end_year: int) -> Dict[int, float]:
-        """Calculate HHI trend over multiple years"""
-        trend = {}
-        for year in range(start_year, end_year + 1):
-            trend[year] = self.calculate_hhi(year)
-        return trend
+        """Calculate HHI trend over multiple years (0 for years without imports)"""
+        cube = self.cube
+        hhi = np.append(cube.hhi, 0.0)   # position -1: years not in the cube
+        return {
+            year: float(hhi[cube.year_index.get(year, -1)])
+            for year in range(start_year, end_year + 1)
+        }
     
     # ========================================================================
     # METRIC 3: China-Plus-One Diversification Score (CPODS)
     # ========================================================================
     
+    @cached_metric
     def calculate_cpods(self, baseline_year: int, current_year: int,
                        alternative_partners: List[str] = None) -> float:
         """
@@ -264,8 +295,7 @@ class DeriskingMetrics:
         """
         if alternative_partners is None:
             # Default alternative partners
-            alternative_partners = ['USA', 'JPN', 'DEU', 'SGP', 'KOR', 
-                                   'ARE', 'AUS', 'GBR', 'FRA', 'ITA']
+            alternative_partners = COUNTRY_GROUPS['CPODS_ALTERNATIVES']
         
         # Get shares for baseline and current
         baseline_shares = self._get_partner_shares(baseline_year)
@@ -290,25 +320,72 @@ class DeriskingMetrics:
         logger.info(f"CPODS ({baseline_year}->{current_year}): {cpods:.2f}")
         return cpods
     
-    def _get_partner_shares(self, year: int) -> Dict[str, float]:
-        """Get import share by partner for a given year"""
-        imports_df = self._filter_india_imports(year)
-        
-        # Calculate partner shares
-        partner_imports = imports_df.groupby('ReporterISO3')['TradeValue in 1000 USD'].sum()
-        total_imports = partner_imports.sum()
+    @cached_metric
+    def cpods_matrices(self, alternative_sets: Dict[str, List[str]],
+                       years: Iterable[int] = None,
+                       china_iso: str = 'CHN') -> Dict[str, pd.DataFrame]:
+        """
+        Calculate CPODS for every baseline/current year pair and many
+        alternative-partner sets at once
         
-        if total_imports == 0:
-            return {}
+        The alternatives' combined share of every set and year comes from
+        one product of the Year × Partner share table with a Partner × Set
+        membership matrix; all year pairs are then formed by broadcasting.
+        Pairs where China's share did not change score 0, as in
+        calculate_cpods.
         
-        # Convert to percentages
-        shares = ((partner_imports / total_imports) * 100).to_dict()
-        return shares
+        Args:
+            alternative_sets: Set name mapped to alternative partner ISO3 codes
+            years: Years to include (default: all years with imports)
+            china_iso: Partner whose share change is the denominator
+            
+        Returns:
+            Dictionary mapping set name to a DataFrame of CPODS values
+            indexed by Baseline_Year with one column per Current_Year
+        """
+        cube = self.cube
+        years = cube.years.tolist() if years is None else [int(y) for y in years]
+        
+        # Shares for the requested years (0 for years without imports)
+        year_pos = [cube.year_index.get(y, -1) for y in years]
+        shares = np.pad(cube.partner_share_matrix, ((0, 1), (0, 0)))[year_pos]   # Year × Partner
+        
+        # Partner × Set membership (a partner listed twice counts twice)
+        names = list(alternative_sets)
+        membership = np.zeros((len(cube.partners), len(names)))
+        for j, name in enumerate(names):
+            for iso in alternative_sets[name]:
+                p = cube.partner_pos(iso)
+                if p is not None:
+                    membership[p, j] += 1
+        
+        alternatives = (shares @ membership).T                            # Set × Year
+        c = cube.partner_pos(china_iso)
+        china = shares[:, c] if c is not None else np.zeros(len(years))   # Year
+        
+        # [baseline, current] differences by broadcasting
+        china_change = np.abs(china[None, :] - china[:, None])           # Year × Year
+        alternatives_change = alternatives[:, None, :] - alternatives[:, :, None]
+        cpods = np.divide(alternatives_change, china_change,
+                          out=np.zeros_like(alternatives_change), where=china_change != 0)
+        
+        index = pd.Index(years, name='Baseline_Year')
+        columns = pd.Index(years, name='Current_Year')
+        return {
+            name: pd.DataFrame(cpods[j], index=index, columns=columns)
+            for j, name in enumerate(names)
+        }
+    
+    @cached_metric
+    def _get_partner_shares(self, year: int) -> Dict[str, float]:
+        """Get import share by partner for a given year"""
+        return self.cube.partner_shares(year)
     
     # ========================================================================
     # METRIC 4: Domestic Manufacturing Substitution Index (DMSI)
     # ========================================================================
     
+    @cached_metric
     def calculate_dmsi_proxy(self, product_code: str, baseline_year: int, 
                             current_year: int) -> float:
         """
@@ -334,16 +411,118 @@ class DeriskingMetrics:
         logger.info(f"DMSI ({product_code}, {baseline_year}->{current_year}): {dmsi:.2f}")
         return dmsi
     
+    @cached_metric
+    def product_import_matrix(self, years: Iterable[int] = None) -> pd.DataFrame:
+        """
+        Imports of every product in every year
+        
+        Args:
+            years: Years to include (default: all years with imports)
+            
+        Returns:
+            DataFrame of import values indexed by ProductCode with one
+            column per year (0 for years without imports)
+        """
+        sparse = self.sparse
+        years = sparse.years.tolist() if years is None else [int(y) for y in years]
+        
+        year_pos = [sparse.year_index.get(y, -1) for y in years]
+        values = np.pad(sparse.product_totals, ((0, 1), (0, 0)))[year_pos]   # Year × Product
+        
+        return pd.DataFrame(
+            values.T,
+            index=pd.Index(sparse.products, name='ProductCode'),
+            columns=pd.Index(years, name='Year')
+        )
+    
+    @cached_metric
+    def dmsi_matrix(self, baseline_year: int, years: Iterable[int] = None) -> pd.DataFrame:
+        """
+        Calculate DMSI proxy of every product against a baseline year
+        
+        Args:
+            baseline_year: Baseline year
+            years: Current years to include (default: all years with imports)
+            
+        Returns:
+            DataFrame of DMSI values indexed by ProductCode with one column
+            per current year (0 for products without baseline imports)
+        """
+        imports = self.product_import_matrix(years)
+        baseline = self.product_import_matrix([baseline_year]).iloc[:, 0].to_numpy()[:, None]
+        
+        dmsi = np.divide(baseline - imports.to_numpy(), baseline,
+                         out=np.zeros(imports.shape), where=baseline != 0)
+        return pd.DataFrame(dmsi, index=imports.index, columns=imports.columns)
+    
+    @cached_metric
+    def dmsi_table(self, baseline_year: int, current_year: int) -> pd.DataFrame:
+        """
+        Baseline imports, current imports and DMSI proxy of every product
+        
+        Args:
+            baseline_year: Baseline year
+            current_year: Current year
+            
+        Returns:
+            DataFrame indexed by ProductCode with Baseline_Imports,
+            Current_Imports and DMSI columns
+        """
+        imports = self.product_import_matrix([baseline_year, current_year])
+        return pd.DataFrame({
+            'Baseline_Imports': imports.iloc[:, 0],
+            'Current_Imports': imports.iloc[:, 1],
+            'DMSI': self.dmsi_matrix(baseline_year, [current_year]).iloc[:, 0]
+        })
+    
+    def rank_dmsi(self, baseline_year: int, current_year: int,
+                  top: Optional[int] = 10) -> Dict[str, pd.DataFrame]:
+        """
+        Rank products by import substitution between two years
+        
+        Products without baseline imports have no DMSI and are not ranked.
+        
+        Args:
+            baseline_year: Baseline year
+            current_year: Current year
+            top: Number of products in each ranking (None: all ranked products)
+            
+        Returns:
+            Dictionary with 'substituted' (largest import reduction first)
+            and 'newly_dependent' (largest import growth first) tables
+        """
+        table = self.dmsi_table(baseline_year, current_year)
+        table = table[table['Baseline_Imports'] != 0]
+        
+        substituted = table.sort_values('DMSI', ascending=False, kind='stable')
+        newly_dependent = table.sort_values('DMSI', kind='stable')
+        if top is not None:
+            substituted, newly_dependent = substituted.head(top), newly_dependent.head(top)
+        
+        return {'substituted': substituted, 'newly_dependent': newly_dependent}
+    
+    @cached_metric
     def _get_product_imports(self, product_code: str, year: int) -> float:
-        """Get total imports for a product in a given year"""
-        imports_df = self._filter_india_imports(year)
-        product_imports = imports_df[imports_df['ProductCode'] == product_code]['TradeValue in 1000 USD'].sum()
-        return product_imports
+        """
+        Get total imports for a product in a given year
+        
+        product_code may be coarser than the data (e.g. chapter '85' on HS6
+        records): all products under it are summed.
+        """
+        sparse = self.sparse
+        y = sparse.year_pos(year)
+        products = sparse.product_positions([product_code])
+        
+        if y is None or not products:
+            return 0.0
+        
+        return float(sparse.product_totals[y, products].sum())
     
     # ========================================================================
     # METRIC 5: Strategic Sector Vulnerability Index (SSVI)
     # ========================================================================
     
+    @cached_metric
     def calculate_ssvi(self, year: int, sector_products: List[str],
                       criticality_weight: float = 1.0) -> float:
         """
@@ -359,13 +538,17 @@ class DeriskingMetrics:
         Returns:
             SSVI value
         """
-        imports_df = self._filter_india_imports(year)
+        sparse = self.sparse
+        y = sparse.year_pos(year)
         
         # Filter for sector products
-        sector_df = imports_df[imports_df['ProductCode'].isin(sector_products)]
+        products = sparse.product_positions(sector_products)
         
-        sector_total = sector_df['TradeValue in 1000 USD'].sum()
-        sector_china = sector_df[sector_df['ReporterISO3'] == 'CHN']['TradeValue in 1000 USD'].sum()
+        if y is None or not products:
+            return 0.0
+        
+        sector_total = sparse.product_totals[y, products].sum()
+        sector_china = sparse.partner_product_values('CHN')[y, products].sum()
         
         if sector_total == 0:
             return 0.0
@@ -376,10 +559,81 @@ class DeriskingMetrics:
         logger.info(f"SSVI ({year}): {ssvi:.2f}")
         return ssvi
     
+    @cached_metric
+    def ssvi_matrix(self, years: Iterable[int] = None, level: int = 2,
+                    criticality: Dict[str, float] = None,
+                    partner_iso: str = 'CHN') -> pd.DataFrame:
+        """
+        Calculate SSVI for every HS sector and every year at once
+        
+        Sectors are the distinct level-digit prefixes of the product codes
+        (2 = chapters, 4 = headings); products with shorter codes are left
+        out. The partner's share of every sector is computed from one
+        aggregation of the sparse imports' Year × Product totals.
+        
+        Args:
+            years: Years to include (default: all years with imports)
+            level: HS prefix length defining a sector
+            criticality: Importance weight per sector code (default 1.0)
+            partner_iso: Partner whose share is measured (default: CHN)
+            
+        Returns:
+            DataFrame of SSVI values indexed by Year with one column per
+            sector code (0 where a sector has no imports)
+        """
+        sparse = self.sparse
+        years = sparse.years.tolist() if years is None else [int(y) for y in years]
+        criticality = criticality or {}
+        
+        # Sector of every product on the product axis
+        eligible = np.array([len(code) >= level for code in sparse.products], dtype=bool)
+        sectors, sector_pos = np.unique(
+            [code[:level] for code in sparse.products[eligible]], return_inverse=True
+        )
+        
+        product_totals = sparse.product_totals[:, eligible]
+        partner_values = sparse.partner_product_values(partner_iso)[:, eligible]
+        
+        # Fold products into sectors: Year × Sector
+        sector_totals = np.zeros((len(sparse.years), len(sectors)))
+        sector_partner = np.zeros_like(sector_totals)
+        np.add.at(sector_totals.T, sector_pos, product_totals.T)
+        np.add.at(sector_partner.T, sector_pos, partner_values.T)
+        
+        dependency = np.divide(sector_partner, sector_totals,
+                               out=np.zeros_like(sector_totals), where=sector_totals > 0) * 100
+        weights = np.array([criticality.get(code, 1.0) for code in sectors])
+        
+        ssvi = pd.DataFrame(
+            dependency * weights,
+            index=pd.Index(sparse.years, name='Year'),
+            columns=pd.Index(sectors.astype(str), name='Sector')
+        )
+        return ssvi.reindex(pd.Index(years, name='Year'), fill_value=0.0)
+    
+    def rank_sector_vulnerability(self, year: int, level: int = 2,
+                                  criticality: Dict[str, float] = None,
+                                  partner_iso: str = 'CHN') -> pd.Series:
+        """
+        Rank every HS sector of a year by SSVI
+        
+        Args:
+            year: Year to rank
+            level: HS prefix length defining a sector
+            criticality: Importance weight per sector code (default 1.0)
+            partner_iso: Partner whose share is measured (default: CHN)
+            
+        Returns:
+            Series of SSVI values indexed by sector code, highest first
+        """
+        ssvi = self.ssvi_matrix([year], level, criticality, partner_iso).loc[year]
+        return ssvi.sort_values(ascending=False, kind='stable')
+    
     # ========================================================================
     # METRIC 6: Trade Balance Improvement Index (TBII)
     # ========================================================================
     
+    @cached_metric
     def calculate_tbii(self, baseline_year: int, current_year: int,
                       partner_iso: str = 'CHN') -> float:
         """
@@ -405,33 +659,94 @@ class DeriskingMetrics:
         logger.info(f"TBII ({partner_iso}, {baseline_year}->{current_year}): {tbii:.2f}%")
         return tbii
     
+    @cached_metric
     def _get_trade_deficit(self, year: int, partner_iso: str) -> float:
         """Calculate trade deficit with a partner"""
-        # Get India's imports from partner (Reporter exports to India)
-        imports_mask = (
-            (self.df['PartnerISO3'] == 'IND') &
-            (self.df['ReporterISO3'] == partner_iso) &
-            (self.df['TradeFlowName'] == 'Export') &
-            (self.df['Year'] == year)
-        )
-        imports = self.df[imports_mask]['TradeValue in 1000 USD'].sum()
-        
-        # Get India's exports to partner (India exports to partner)
-        exports_mask = (
-            (self.df['ReporterISO3'] == 'IND') &
-            (self.df['PartnerISO3'] == partner_iso) &
-            (self.df['TradeFlowName'] == 'Export') &
-            (self.df['Year'] == year)
-        )
-        exports = self.df[exports_mask]['TradeValue in 1000 USD'].sum()
+        return float(self.deficit_matrix([year], [partner_iso]).iat[0, 0])
+    
+    @cached_metric
+    def trade_balance_table(self) -> pd.DataFrame:
+        """
+        Mirror pivot of India's imports and exports by year and counterpart
+        
+        Imports are partner-reported exports to India, exports are
+        India-reported exports to the partner; each side is aggregated once
+        by (Year, counterpart).
+        
+        Returns:
+            DataFrame indexed by (Year, Partner) with Imports, Exports and
+            Deficit (Imports - Exports) columns
+        """
+        value = 'TradeValue in 1000 USD'
+        
+        imports = self._filter_india_imports()
+        imports = imports.groupby(['Year', 'ReporterISO3'], observed=True)[value].sum()
+        
+        exports = self.dataset.india_exports
+        exports = exports.groupby(['Year', 'PartnerISO3'], observed=True)[value].sum()
+        
+        # Align both sides on plain (Year, Partner) labels
+        for side in (imports, exports):
+            side.index = pd.MultiIndex.from_arrays(
+                [side.index.get_level_values(0).astype(int),
+                 side.index.get_level_values(1).astype(str)],
+                names=['Year', 'Partner']
+            )
         
-        deficit = imports - exports
-        return deficit
+        table = pd.concat([imports, exports], axis=1, keys=['Imports', 'Exports']).fillna(0.0)
+        table['Deficit'] = table['Imports'] - table['Exports']
+        return table.sort_index()
+    
+    @cached_metric
+    def deficit_matrix(self, years: Iterable[int] = None,
+                       partners: Iterable[str] = None) -> pd.DataFrame:
+        """
+        Trade deficit with every partner in every year
+        
+        Args:
+            years: Years to include (default: all years with trade)
+            partners: Partner ISO3 codes to include (default: all partners)
+            
+        Returns:
+            DataFrame of deficits indexed by Year with one column per
+            partner (0 where there is no trade)
+        """
+        deficits = self.trade_balance_table()['Deficit'].unstack('Partner', fill_value=0.0)
+        
+        if years is not None:
+            deficits = deficits.reindex(pd.Index([int(y) for y in years], name='Year'), fill_value=0.0)
+        if partners is not None:
+            deficits = deficits.reindex(columns=pd.Index(list(partners), name='Partner'), fill_value=0.0)
+        return deficits
+    
+    @cached_metric
+    def tbii_by_partner(self, baseline_year: int, years: Iterable[int] = None,
+                        partners: Iterable[str] = None) -> pd.DataFrame:
+        """
+        Calculate TBII of every partner in every year against one baseline year
+        
+        Args:
+            baseline_year: Baseline year
+            years: Current years to include (default: all years with trade)
+            partners: Partner ISO3 codes to include (default: all partners)
+            
+        Returns:
+            DataFrame of TBII percentages indexed by Year with one column
+            per partner (0 where the baseline deficit is 0)
+        """
+        deficits = self.deficit_matrix(years, partners)
+        baseline = self.deficit_matrix([baseline_year], deficits.columns).to_numpy()   # 1 × Partner
+        current = deficits.to_numpy()
+        
+        tbii = np.divide((baseline - current) * 100, baseline,
+                         out=np.zeros(current.shape), where=baseline != 0)
+        return pd.DataFrame(tbii, index=deficits.index, columns=deficits.columns)
     
     # ========================================================================
     # METRIC 7: Supply Chain Resilience Score (SCRS)
     # ========================================================================
     
+    @cached_metric
     def calculate_scrs(self, year: int, w1: float = 0.4, w2: float = 0.3,
                       w3: float = 0.3) -> float:
         """
@@ -448,66 +763,85 @@ class DeriskingMetrics:
         Returns:
             SCRS value (0-100)
         """
-        source_diversity = self._calculate_source_diversity(year)
-        geographic_diversity = self._calculate_geographic_diversity(year)
-
-        critical_redundancy = self._calculate_critical_redundancy(year)
+        components = self._scrs_component_row(year)
         
-        scrs = (w1 * source_diversity + 
-                w2 * geographic_diversity + 
-                w3 * critical_redundancy)
+        scrs = (w1 * components['Source_Diversity'] + 
+                w2 * components['Geographic_Diversity'] + 
+                w3 * components['Critical_Redundancy'])
         
         logger.info(f"SCRS ({year}): {scrs:.2f}")
         return scrs
     
+    @cached_metric
+    def calculate_scrs_trend(self, start_year: int, end_year: int, w1: float = 0.4,
+                             w2: float = 0.3, w3: float = 0.3) -> pd.DataFrame:
+        """
+        Calculate SCRS and its components over multiple years
+        
+        Args:
+            start_year: Start year
+            end_year: End year
+            w1: Weight for source diversity
+            w2: Weight for geographic diversity
+            w3: Weight for critical product redundancy
+            
+        Returns:
+            DataFrame indexed by Year with the three components and SCRS
+            (years without imports score 0)
+        """
+        table = self.scrs_components().reindex(
+            pd.Index(range(start_year, end_year + 1), name='Year'), fill_value=0.0
+        )
+        table['SCRS'] = (w1 * table['Source_Diversity'] + 
+                         w2 * table['Geographic_Diversity'] + 
+                         w3 * table['Critical_Redundancy'])
+        return table
+    
+    @cached_metric
+    def scrs_components(self, max_sources: int = 20, max_regions: int = 7) -> pd.DataFrame:
+        """
+        SCRS components of every year with imports, computed in one pass
+        
+        All three components are registered metrics evaluated in one batch:
+        source diversity from the yearly HHI, geographic diversity from
+        Year × Region totals and critical redundancy from the Year × Product
+        supplier counts.
+        The table is cached per parameter set; re-weighting w1/w2/w3 only
+        needs this table.
+        
+        Args:
+            max_sources: Effective number of suppliers scoring 100
+            max_regions: Number of regions used to normalize the Simpson index
+            
+        Returns:
+            DataFrame indexed by Year with Source_Diversity,
+            Geographic_Diversity and Critical_Redundancy (0-100 each)
+        """
+        return self.evaluate(
+            ['Source_Diversity', 'Geographic_Diversity', 'Critical_Redundancy'],
+            max_sources=max_sources, max_regions=max_regions
+        )
+    
+    def _scrs_component_row(self, year: int, **params) -> pd.Series:
+        """SCRS components of one year (all 0 for years without imports)"""
+        table = self.scrs_components(**params)
+        if year in table.index:
+            return table.loc[year]
+        return pd.Series(0.0, index=table.columns)
+    
     def _calculate_source_diversity(self, year: int, max_sources: int = 20) -> float:
         """
         Source diversity based on effective number of suppliers (inverse HHI)
 
         Returns a 0–100 score
         """
-        shares = self._get_partner_shares(year)
-
-        if not shares:
-            return 0.0
-
-        # Convert percentages to fractions
-        hhi = sum((s / 100) ** 2 for s in shares.values())
-
-        if hhi == 0:
-            return 0.0
-
-        effective_sources = 1 / hhi
-
-        # Normalize to 0–100
-        return min(effective_sources / max_sources * 100, 100)
+        return float(self._scrs_component_row(year, max_sources=max_sources)['Source_Diversity'])
 
     def _calculate_geographic_diversity(self, year: int, max_regions: int = 7) -> float:
         """
         Geographic diversity based on regional concentration (Simpson index)
         """
-        imports_df = self._filter_india_imports(year)
-
-        if imports_df.empty:
-            return 0.0
-
-        # Map countries to regions (you must define this)
-        imports_df['Region'] = imports_df['ReporterISO3'].map(self.country_to_region)
-
-        # Aggregate by region
-        region_imports = imports_df.groupby('Region')['TradeValue in 1000 USD'].sum()
-        total = region_imports.sum()
-
-        if total == 0:
-            return 0.0
-
-        shares = region_imports / total
-
-        # Simpson geographic diversity
-        simpson = 1 - (shares ** 2).sum()
-
-        # Normalize to 0–100
-        return min(simpson / (1 - 1 / max_regions) * 100, 100)
+        return float(self._scrs_component_row(year, max_regions=max_regions)['Geographic_Diversity'])
 
 
     def _calculate_geographic_diversity1(self, year: int) -> float:
@@ -525,19 +859,81 @@ class DeriskingMetrics:
         
         Simplified proxy: diversity of suppliers for top imported products
         """
-        imports_df = self._filter_india_imports(year)
+        return float(self._scrs_component_row(year)['Critical_Redundancy'])
+
+
+    # ========================================================================
+    # WINDOW AVERAGES (TDI, HHI, SCRS)
+    # ========================================================================
+    
+    @cached_metric
+    def window_averages(self, metric: str, partner_iso: str = 'CHN', w1: float = 0.4,
+                        w2: float = 0.3, w3: float = 0.3) -> WindowAverages:
+        """
+        Prefix-sum index answering any multi-year average of a metric
         
-        # Count suppliers per product
-        product_suppliers = imports_df.groupby('ProductCode')['ReporterISO3'].nunique()
+        Built once from the metric's yearly values (years with imports);
+        every window average is then O(1).
         
-        if len(product_suppliers) == 0:
-            return 0.0
+        Args:
+            metric: 'TDI', 'HHI' or 'SCRS'
+            partner_iso: Partner for TDI
+            w1, w2, w3: SCRS component weights
+            
+        Returns:
+            WindowAverages over the metric's yearly series
+        """
+        cube = self.cube
+        
+        if metric == 'TDI':
+            p = cube.partner_pos(partner_iso)
+            values = cube.partner_share_matrix[:, p] if p is not None else np.zeros(len(cube.years))
+        elif metric == 'HHI':
+            values = cube.hhi
+        elif metric == 'SCRS':
+            values = self.calculate_scrs_trend(
+                int(cube.years.min()), int(cube.years.max()), w1, w2, w3
+            ).loc[cube.years, 'SCRS'].to_numpy()
+        else:
+            raise ValueError(f"Unknown window metric: {metric} (expected TDI, HHI or SCRS)")
+        
+        return WindowAverages(cube.years, values)
+    
+    def calculate_window_average(self, metric: str, start_year: int, end_year: int,
+                                 partner_iso: str = 'CHN', w1: float = 0.4,
+                                 w2: float = 0.3, w3: float = 0.3) -> float:
+        """
+        Average of a metric's yearly values over start_year..end_year
         
-        # Average number of suppliers per product
-        avg_suppliers = product_suppliers.mean()
+        Args:
+            metric: 'TDI', 'HHI' or 'SCRS'
+            start_year: First year of the window
+            end_year: Last year of the window (inclusive)
+            partner_iso: Partner for TDI
+            w1, w2, w3: SCRS component weights
+            
+        Returns:
+            Window average (0 if no year of the window has imports)
+        """
+        average = self.window_averages(metric, partner_iso, w1, w2, w3).mean(start_year, end_year)
+        return 0.0 if np.isnan(average) else average
+    
+    def calculate_rolling(self, metric: str, window: int = 3,
+                          partner_iso: str = 'CHN', w1: float = 0.4,
+                          w2: float = 0.3, w3: float = 0.3) -> pd.Series:
+        """
+        Trailing k-year average of a metric for every year
         
-        # Normalize (assume max 10 suppliers per product is excellent)
-        return min(avg_suppliers / 10 * 100, 100)
+        Args:
+            metric: 'TDI', 'HHI' or 'SCRS'
+            window: Number of years per window
+            partner_iso: Partner for TDI
+            w1, w2, w3: SCRS component weights
+            
+        Returns:
+            Series of averages indexed by the last year of each window
+        """
+        return self.window_averages(metric, partner_iso, w1, w2, w3).rolling(window)
 
 
 def main():
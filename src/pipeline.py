@@ -0,0 +1,423 @@
+"""
+Pipeline Module
+DAG of analysis stages with declared inputs and outputs, skipped when the
+content hashes of their inputs, code and parameters match the last run
+"""
+
+import ast
+import glob
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import logging
+from src import profiler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _module_sources(modules: Iterable[str]) -> List[Path]:
+    """
+    Source files of modules and of the modules they import from their package
+
+    Imports are followed transitively within each module's top-level
+    package (e.g. src.derisking_analyzer pulls in src.metrics_calculator),
+    so editing a helper module invalidates every stage using it while
+    third-party libraries are ignored.
+    """
+    sources = {}
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        if module in sources:
+            continue
+        spec = importlib.util.find_spec(module)
+        if spec is None or not spec.origin or not Path(spec.origin).is_file():
+            sources[module] = None
+            continue
+        sources[module] = Path(spec.origin)
+
+        package = module.split('.')[0]
+        tree = ast.parse(sources[module].read_text(encoding='utf-8'))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                names = [node.module]
+            elif isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            else:
+                continue
+            pending.extend(name for name in names if name.split('.')[0] == package)
+
+    return sorted(path for path in sources.values() if path is not None)
+
+
+def code_digest(modules: Iterable[str]) -> str:
+    """
+    SHA-256 over the source of modules and of the package modules they import
+
+    Args:
+        modules: Module names, e.g. ['src.derisking_analyzer']
+
+    Returns:
+        Hex digest that changes whenever any of that code changes
+    """
+    digest = hashlib.sha256()
+    for path in _module_sources(modules):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+# Stages and context of a pool worker, set by _init_worker
+_worker_state: Dict[str, Any] = {}
+
+
+def _pool_context():
+    """Fork where available: workers then share the parent's memory copy-on-write"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def _init_worker(stages: Dict[str, 'Stage'], context: Any, profile: bool = False):
+    """
+    Pool worker initializer
+
+    With fork the arguments are inherited rather than pickled, so data held
+    by the context is shared with the parent instead of copied.
+    """
+    _worker_state['stages'] = stages
+    _worker_state['context'] = context
+
+    if profile:
+        # A forked worker inherits the parent's profiler; start it empty
+        (profiler.active() or profiler.enable()).spans = []
+
+
+def _run_stage(name: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run one stage in a pool worker
+
+    Returns:
+        Profile spans recorded during the stage (None when not profiling)
+    """
+    active = profiler.active()
+    start = len(active.spans) if active is not None else 0
+    with profiler.span(f"stage:{name}"):
+        _worker_state['stages'][name].run(_worker_state['context'])
+    return active.spans[start:] if active is not None else None
+
+
+class Stage:
+    """
+    One step of the pipeline
+
+    A stage reads its input files, writes its output files and is defined
+    by the source of its modules and its parameters. Dependencies are not
+    listed by hand: a stage runs after every stage producing one of its
+    inputs.
+    """
+
+    def __init__(self, name: str, run: Callable[[Any], None],
+                 inputs: Iterable[str] = (), outputs: Iterable[str] = (),
+                 modules: Iterable[str] = (), params: Optional[Dict] = None):
+        """
+        Declare a stage
+
+        Args:
+            name: Stage name
+            run: Function taking the pipeline context
+            inputs: Files, directories or glob patterns the stage reads
+            outputs: Files or directories the stage writes
+            modules: Modules whose source defines the stage's results
+            params: JSON-serializable parameters that change its results
+        """
+        self.name = name
+        self.run = run
+        self.inputs = [str(path) for path in inputs]
+        self.outputs = [str(path) for path in outputs]
+        self.modules = list(modules)
+        self.params = params or {}
+
+
+class Pipeline:
+    """
+    Stages executed in dependency order with content-hash caching
+
+    Before a stage runs, its key is computed from the SHA-256 of every
+    input file, the source of its modules and its parameters. If the key
+    equals the one recorded after its last successful run and all its
+    outputs exist, the stage is skipped. Because keys hash content rather
+    than timestamps, a stage that rewrites identical outputs does not
+    trigger its dependents.
+    """
+
+    def __init__(self, stages: Iterable[Stage],
+                 state_path: str = "output/derisking_analysis/pipeline_state.json"):
+        """
+        Build the stage graph
+
+        Args:
+            stages: Stages of the pipeline
+            state_path: JSON file recording stage keys and file digests
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = Path(state_path)
+
+        # Stage -> stages producing its inputs
+        producers = {
+            output: stage.name
+            for stage in self.stages.values() for output in stage.outputs
+        }
+        self.dependencies = {
+            stage.name: sorted({
+                producers[path] for path in stage.inputs
+                if path in producers and producers[path] != stage.name
+            })
+            for stage in self.stages.values()
+        }
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Stage names with every stage after its dependencies"""
+        order = []
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        while remaining:
+            ready = [name for name in self.stages if name in remaining and not remaining[name]]
+            if not ready:
+                raise ValueError(f"Pipeline stages form a cycle: {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+
+    def load_state(self) -> Dict:
+        """Load the recorded stage keys and file digests"""
+        if not self.state_path.exists():
+            return {'stages': {}, 'files': {}}
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            state.setdefault('stages', {})
+            state.setdefault('files', {})
+            return state
+        except Exception as e:
+            logger.error(f"Error reading pipeline state {self.state_path}: {e}")
+            return {'stages': {}, 'files': {}}
+
+    def _save_state(self, state: Dict):
+        """Save stage keys and file digests"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, 'w') as f:
+            json.dump(state, f, indent=2)
+
+    @staticmethod
+    def _expand(spec: str) -> List[Path]:
+        """Files matched by an input spec (file, directory or glob pattern)"""
+        if any(char in spec for char in '*?['):
+            return sorted(Path(path) for path in glob.glob(spec) if Path(path).is_file())
+        path = Path(spec)
+        if path.is_dir():
+            return sorted(p for p in path.rglob('*') if p.is_file())
+        return [path] if path.is_file() else []
+
+    @staticmethod
+    def _file_digest(path: Path, files: Dict, block_size: int = 1 << 20) -> str:
+        """
+        SHA-256 of a file's content
+
+        Digests are memoized in the state by size and modification time,
+        so large unchanged inputs (ZIP archives, the consolidated CSV) are
+        not re-read on every run.
+        """
+        stat = path.stat()
+        entry = files.get(str(path))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+
+        files[str(path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest.hexdigest()
+        }
+        return files[str(path)]['sha256']
+
+    def stage_key(self, stage: Stage, files: Dict) -> str:
+        """
+        Content hash of everything a stage's results depend on
+
+        Args:
+            stage: Stage to hash
+            files: Memoized file digests (updated in place)
+
+        Returns:
+            Hex digest over input files, module source and parameters
+        """
+        inputs = {
+            spec: {str(path): self._file_digest(path, files) for path in self._expand(spec)}
+            for spec in stage.inputs
+        }
+
+        modules = {
+            str(path): self._file_digest(path, files)
+            for path in _module_sources(stage.modules)
+        }
+
+        payload = json.dumps(
+            {'inputs': inputs, 'modules': modules, 'params': stage.params},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _outputs_exist(self, stage: Stage) -> bool:
+        """True if every declared output of a stage exists"""
+        return all(Path(path).exists() for path in stage.outputs)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def select(self, names: Iterable[str]) -> List[str]:
+        """Stages in execution order, restricted to names"""
+        names = set(names)
+        unknown = names - set(self.stages)
+        if unknown:
+            raise KeyError(f"Unknown stages: {sorted(unknown)} (stages: {self.order})")
+        return [name for name in self.order if name in names]
+
+    def _is_up_to_date(self, stage: Stage, key: str, state: Dict) -> bool:
+        """True if a stage's key matches its last run and its outputs exist"""
+        return state['stages'].get(stage.name, {}).get('key') == key and self._outputs_exist(stage)
+
+    def _record(self, name: str, key: str, state: Dict, results: Dict[str, str]):
+        """Record a successful stage run (a failed stage is retried next time)"""
+        state['stages'][name] = {'key': key}
+        self._save_state(state)
+        results[name] = 'ran'
+        logger.info(f"✓ Stage '{name}' complete")
+
+    def run(self, context: Any, stages: Optional[Iterable[str]] = None,
+            force: bool = False, jobs: int = 1,
+            prefork: Optional[Callable[[List[Stage]], None]] = None) -> Dict[str, str]:
+        """
+        Run stages in dependency order, skipping up-to-date ones
+
+        Stages that are not selected are not run, but their outputs are
+        still hashed as inputs of the selected ones.
+
+        With jobs > 1, stages whose dependencies are done run concurrently
+        in a process pool. A stage that is the only one to run executes in
+        this process; the pool is started the first time two stages can
+        run at once. Workers are forked where the platform supports it, so
+        they inherit the context (and any data loaded into it by prefork)
+        without copying or pickling it.
+
+        Args:
+            context: Object passed to every stage's run function
+            stages: Stage names to consider (default: all)
+            force: Run every selected stage even if it is up to date
+            jobs: Maximum number of stages running at once
+            prefork: Called with the stages still to run right before a
+                forked pool is started, e.g. to load data the workers will
+                share
+
+        Returns:
+            Mapping of stage name to 'ran' or 'skipped'
+        """
+        selected = self.order if stages is None else self.select(stages)
+        selected_set = set(selected)
+        state = self.load_state()
+        results = {}
+
+        pending = list(selected)
+        done = set()
+        queue = []        # (name, key) of stages ready to run
+        running = {}      # future -> (name, key)
+        executor = None
+
+        try:
+            while pending or queue or running:
+                # Resolve every stage whose dependencies are done
+                ready = [
+                    name for name in pending
+                    if selected_set.intersection(self.dependencies[name]) <= done
+                ]
+                skipped = False
+                for name in ready:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    key = self.stage_key(stage, state['files'])
+                    if not force and self._is_up_to_date(stage, key, state):
+                        logger.info(f"⏭️  Stage '{name}' is up to date, skipping")
+                        results[name] = 'skipped'
+                        done.add(name)
+                        skipped = True
+                    else:
+                        queue.append((name, key))
+                if skipped:
+                    # Skipped stages may unblock others
+                    continue
+
+                if queue and (jobs <= 1 or (executor is None and len(queue) == 1 and not running)):
+                    name, key = queue.pop(0)
+                    logger.info(f"▶ Running stage '{name}'")
+                    with profiler.span(f"stage:{name}"):
+                        self.stages[name].run(context)
+                    self._record(name, key, state, results)
+                    done.add(name)
+                    continue
+
+                if queue:
+                    if executor is None:
+                        mp_context = _pool_context()
+                        if mp_context.get_start_method() == 'fork':
+                            upcoming = ([self.stages[name] for name, _ in queue] +
+                                        [self.stages[name] for name in pending])
+                            # Import stage modules once here rather than in every worker
+                            for stage in upcoming:
+                                for module in stage.modules:
+                                    importlib.import_module(module)
+                            if prefork is not None:
+                                prefork(upcoming)
+                        executor = ProcessPoolExecutor(
+                            max_workers=jobs,
+                            mp_context=mp_context,
+                            initializer=_init_worker,
+                            initargs=(self.stages, context, profiler.active() is not None)
+                        )
+                        logger.info(f"Started pool of {jobs} worker processes")
+                    while queue:
+                        name, key = queue.pop(0)
+                        logger.info(f"▶ Running stage '{name}' in worker")
+                        running[executor.submit(_run_stage, name)] = (name, key)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, key = running.pop(future)
+                    spans = future.result()   # re-raises a failure of the stage
+                    if spans:
+                        profiler.active().extend(spans)
+                    self._record(name, key, state, results)
+                    done.add(name)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        self._save_state(state)
+        return results
@@ -0,0 +1,267 @@
+"""
+Profiler Module
+Wall time, CPU time, peak memory and rows scanned of pipeline stages and
+analysis method calls, written as a JSON profile and a folded stack dump
+"""
+
+import functools
+import importlib
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Classes whose method calls are recorded when profiling is enabled
+PROFILED_CLASSES = [
+    'src.metrics_calculator.DeriskingMetrics',
+    'src.derisking_analyzer.DeriskingAnalyzer',
+    'src.visualizations.DeriskingVisualizer',
+]
+
+# Profiler of this process (None = profiling disabled)
+_active: Optional['Profiler'] = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Profiler:
+    """
+    Nested timing spans
+
+    Every span records its wall time, CPU time, the process's peak RSS when
+    it ends (and how much the peak grew during it) and the number of data
+    rows scanned within it. Spans nest: a method called by another method
+    is recorded under its caller's stack, so per-stack self times form a
+    flame graph.
+    """
+
+    def __init__(self, root: str = 'run'):
+        """
+        Initialize an empty profile
+
+        Args:
+            root: Name of the outermost frame of every stack
+        """
+        self.root = root
+        self.spans: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Record a span around a block
+
+        Args:
+            name: Frame name, e.g. 'stage:metrics' or 'DeriskingMetrics.calculate_tdi'
+        """
+        frame = {
+            'name': name,
+            'rows': 0,
+            'child_wall': 0.0,
+            'peak_start': _peak_rss_mb(),
+            'wall_start': time.perf_counter(),
+            'cpu_start': time.process_time(),
+        }
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - frame['wall_start']
+            cpu = time.process_time() - frame['cpu_start']
+            peak = _peak_rss_mb()
+            stack = ';'.join([self.root] + [f['name'] for f in self._stack])
+            self._stack.pop()
+
+            self.spans.append({
+                'stack': stack,
+                'name': name,
+                'wall_s': wall,
+                'cpu_s': cpu,
+                'self_wall_s': max(wall - frame['child_wall'], 0.0),
+                'rows': frame['rows'],
+                'peak_rss_mb': peak,
+                'rss_growth_mb': (peak - frame['peak_start']) if peak is not None else None,
+            })
+
+            # Rows and time are inclusive of children
+            if self._stack:
+                self._stack[-1]['rows'] += frame['rows']
+                self._stack[-1]['child_wall'] += wall
+
+    def add_rows(self, n: int):
+        """Count n scanned rows in the innermost open span"""
+        if self._stack:
+            self._stack[-1]['rows'] += int(n)
+
+    def extend(self, spans: Iterable[Dict[str, Any]]):
+        """Add spans recorded elsewhere (e.g. by a worker process)"""
+        self.spans.extend(spans)
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Spans aggregated by stack
+
+        Returns:
+            One entry per stack with the number of calls, total wall, CPU
+            and self time, rows scanned and the highest peak RSS, sorted
+            by total wall time
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span['stack'], {
+                'stack': span['stack'], 'name': span['name'], 'calls': 0,
+                'wall_s': 0.0, 'cpu_s': 0.0, 'self_wall_s': 0.0, 'rows': 0,
+                'peak_rss_mb': None
+            })
+            entry['calls'] += 1
+            for field in ['wall_s', 'cpu_s', 'self_wall_s', 'rows']:
+                entry[field] += span[field]
+            if span['peak_rss_mb'] is not None:
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, span['peak_rss_mb'])
+        return sorted(totals.values(), key=lambda entry: entry['wall_s'], reverse=True)
+
+    def folded(self) -> str:
+        """
+        Folded stack dump (one 'frame;frame;frame value' line per stack)
+
+        Values are self wall times in microseconds, the input format of
+        flamegraph.pl, speedscope and inferno.
+        """
+        self_times: Dict[str, float] = {}
+        for span in self.spans:
+            self_times[span['stack']] = self_times.get(span['stack'], 0.0) + span['self_wall_s']
+        return ''.join(
+            f"{stack} {int(round(seconds * 1e6))}\n"
+            for stack, seconds in sorted(self_times.items())
+        )
+
+    def save(self, output_dir: str = "output/derisking_analysis",
+             run_info: Optional[Dict[str, Any]] = None) -> Tuple[Path, Path]:
+        """
+        Write profile.json and profile.folded
+
+        Args:
+            output_dir: Directory for the profile files
+            run_info: Details of the run stored with the profile (e.g.
+                which stages ran or were skipped)
+
+        Returns:
+            Paths of the JSON profile and the folded stack dump
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        stages = [span for span in self.summary() if span['name'].startswith('stage:')]
+        profile = {
+            'run': run_info or {},
+            'stages': sorted(stages, key=lambda entry: entry['stack']),
+            'calls': self.summary(),
+            'spans': self.spans,
+        }
+
+        json_path = output_dir / "profile.json"
+        with open(json_path, 'w') as f:
+            json.dump(profile, f, indent=2)
+
+        folded_path = output_dir / "profile.folded"
+        with open(folded_path, 'w') as f:
+            f.write(self.folded())
+
+        logger.info(f"✓ Profile saved to: {json_path} and {folded_path}")
+        return json_path, folded_path
+
+
+def _profiled(label: str, func: Callable) -> Callable:
+    """Record every call of func as a span of the active profiler"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(label):
+            return func(*args, **kwargs)
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+def instrument(cls: type):
+    """
+    Record every call of a class's methods (and property reads)
+
+    Wrapped methods record into whichever profiler is active when they are
+    called and cost one attribute check when profiling is disabled.
+    Instrumenting a class twice has no further effect.
+
+    Args:
+        cls: Class to instrument in place
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith('__') and attr != '__init__':
+            continue
+        label = f"{cls.__name__}.{attr}"
+        if isinstance(value, property) and value.fget is not None:
+            if not getattr(value.fget, '__profiled__', False):
+                setattr(cls, attr, property(_profiled(label, value.fget),
+                                            value.fset, value.fdel, value.__doc__))
+        elif isinstance(value, (staticmethod, classmethod)):
+            if not getattr(value.__func__, '__profiled__', False):
+                setattr(cls, attr, type(value)(_profiled(label, value.__func__)))
+        elif callable(value) and not getattr(value, '__profiled__', False):
+            setattr(cls, attr, _profiled(label, value))
+
+
+def enable(root: str = 'run') -> Profiler:
+    """
+    Start profiling this process
+
+    Instruments the methods of PROFILED_CLASSES and makes span() and
+    count_rows() record into the returned profiler.
+
+    Args:
+        root: Name of the outermost frame of every stack
+
+    Returns:
+        Active Profiler
+    """
+    global _active
+    _active = Profiler(root)
+    for path in PROFILED_CLASSES:
+        module, _, name = path.rpartition('.')
+        instrument(getattr(importlib.import_module(module), name))
+    return _active
+
+
+def active() -> Optional[Profiler]:
+    """Profiler of this process, or None if profiling is disabled"""
+    return _active
+
+
+def span(name: str):
+    """Span of the active profiler (a no-op when profiling is disabled)"""
+    return _active.span(name) if _active is not None else nullcontext()
+
+
+def count_rows(n: int):
+    """Count scanned rows in the active profiler's innermost span"""
+    if _active is not None:
+        _active.add_rows(n)
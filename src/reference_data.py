@@ -0,0 +1,165 @@
+"""
+Reference Data Module
+Integer-coded country and region reference tables, built once per process
+"""
+
+import numpy as np
+from typing import Dict, Iterable, List
+
+
+# Region of every country (ISO3), used for geographic diversity
+COUNTRY_TO_REGION: Dict[str, str] = {
+    # --- SOUTH ASIA ---
+    "AFG": "South Asia", "BGD": "South Asia", "BTN": "South Asia", "IND": "South Asia",
+    "MDV": "South Asia", "NPL": "South Asia", "PAK": "South Asia", "LKA": "South Asia",
+
+    # --- EAST ASIA & PACIFIC ---
+    "ASM": "East Asia & Pacific", "AUS": "East Asia & Pacific", "BRN": "East Asia & Pacific",
+    "KHM": "East Asia & Pacific", "CHN": "East Asia & Pacific", "CXR": "East Asia & Pacific",
+    "CCK": "East Asia & Pacific", "COK": "East Asia & Pacific", "FJI": "East Asia & Pacific",
+    "PYF": "East Asia & Pacific", "GUM": "East Asia & Pacific", "HKG": "East Asia & Pacific",
+    "IDN": "East Asia & Pacific", "JPN": "East Asia & Pacific", "KIR": "East Asia & Pacific",
+    "PRK": "East Asia & Pacific", "KOR": "East Asia & Pacific", "LAO": "East Asia & Pacific",
+    "MAC": "East Asia & Pacific", "MYS": "East Asia & Pacific", "MHL": "East Asia & Pacific",
+    "FSM": "East Asia & Pacific", "MNG": "East Asia & Pacific", "MMR": "East Asia & Pacific",
+    "NRU": "East Asia & Pacific", "NCL": "East Asia & Pacific", "NZL": "East Asia & Pacific",
+    "NIU": "East Asia & Pacific", "NFK": "East Asia & Pacific", "MNP": "East Asia & Pacific",
+    "PLW": "East Asia & Pacific", "PNG": "East Asia & Pacific", "PHL": "East Asia & Pacific",
+    "PCN": "East Asia & Pacific", "WSM": "East Asia & Pacific", "SGP": "East Asia & Pacific",
+    "SLB": "East Asia & Pacific", "TWN": "East Asia & Pacific", "THA": "East Asia & Pacific",
+    "TLS": "East Asia & Pacific", "TKL": "East Asia & Pacific", "TON": "East Asia & Pacific",
+    "TUV": "East Asia & Pacific", "VUT": "East Asia & Pacific", "VNM": "East Asia & Pacific",
+    "WLF": "East Asia & Pacific",
+
+    # --- EUROPE ---
+    "ALB": "Europe", "AND": "Europe", "AUT": "Europe", "BEL": "Europe", "BIH": "Europe",
+    "BGR": "Europe", "HRV": "Europe", "CYP": "Europe", "CZE": "Europe", "DNK": "Europe",
+    "EST": "Europe", "FRO": "Europe", "FIN": "Europe", "FRA": "Europe", "DEU": "Europe",
+    "GIB": "Europe", "GRC": "Europe", "GGY": "Europe", "VAT": "Europe", "HUN": "Europe",
+    "ISL": "Europe", "IRL": "Europe", "IMN": "Europe", "ITA": "Europe", "JEY": "Europe",
+    "LVA": "Europe", "LIE": "Europe", "LTU": "Europe", "LUX": "Europe", "MLT": "Europe",
+    "MDA": "Europe", "MCO": "Europe", "MNE": "Europe", "NLD": "Europe", "MKD": "Europe",
+    "NOR": "Europe", "POL": "Europe", "PRT": "Europe", "ROU": "Europe", "SMR": "Europe",
+    "SRB": "Europe", "SVK": "Europe", "SVN": "Europe", "ESP": "Europe", "SJM": "Europe",
+    "SWE": "Europe", "CHE": "Europe", "UKR": "Europe", "GBR": "Europe", "ALA": "Europe",
+
+    # --- AMERICAS ---
+    "AIA": "Americas", "ATG": "Americas", "ARG": "Americas", "ABW": "Americas",
+    "BHS": "Americas", "BRB": "Americas", "BLZ": "Americas", "BMU": "Americas",
+    "BOL": "Americas", "BES": "Americas", "BRA": "Americas", "VGB": "Americas",
+    "CAN": "Americas", "CYM": "Americas", "CHL": "Americas", "COL": "Americas",
+    "CRI": "Americas", "CUB": "Americas", "CUW": "Americas", "DMA": "Americas",
+    "DOM": "Americas", "ECU": "Americas", "SLV": "Americas", "FLK": "Americas",
+    "GUF": "Americas", "GRL": "Americas", "GRD": "Americas", "GLP": "Americas",
+    "GTM": "Americas", "GUY": "Americas", "HTI": "Americas", "HND": "Americas",
+    "JAM": "Americas", "MTQ": "Americas", "MEX": "Americas", "MSR": "Americas",
+    "NIC": "Americas", "PAN": "Americas", "PRY": "Americas", "PER": "Americas",
+    "PRI": "Americas", "BLM": "Americas", "KNA": "Americas", "LCA": "Americas",
+    "MAF": "Americas", "SPM": "Americas", "VCT": "Americas", "SXM": "Americas",
+    "SUR": "Americas", "TTO": "Americas", "TCA": "Americas", "USA": "Americas",
+    "URY": "Americas", "VEN": "Americas", "VIR": "Americas",
+
+    # --- MENA (Middle East & North Africa) ---
+    "DZA": "MENA", "BHR": "MENA", "EGY": "MENA", "IRN": "MENA", "IRQ": "MENA",
+    "ISR": "MENA", "JOR": "MENA", "KWT": "MENA", "LBN": "MENA", "LBY": "MENA",
+    "MAR": "MENA", "OMN": "MENA", "PSE": "MENA", "QAT": "MENA", "SAU": "MENA",
+    "SYR": "MENA", "TUN": "MENA", "TUR": "MENA", "ARE": "MENA", "YEM": "MENA",
+
+    # --- SUB-SAHARAN AFRICA ---
+    "AGO": "Sub-Saharan Africa", "BEN": "Sub-Saharan Africa", "BWA": "Sub-Saharan Africa",
+    "BFA": "Sub-Saharan Africa", "BDI": "Sub-Saharan Africa", "CPV": "Sub-Saharan Africa",
+    "CMR": "Sub-Saharan Africa", "CAF": "Sub-Saharan Africa", "TCD": "Sub-Saharan Africa",
+    "COM": "Sub-Saharan Africa", "COG": "Sub-Saharan Africa", "COD": "Sub-Saharan Africa",
+    "CIV": "Sub-Saharan Africa", "DJI": "Sub-Saharan Africa", "GNQ": "Sub-Saharan Africa",
+    "ERI": "Sub-Saharan Africa", "SWZ": "Sub-Saharan Africa", "ETH": "Sub-Saharan Africa",
+    "GAB": "Sub-Saharan Africa", "GMB": "Sub-Saharan Africa", "GHA": "Sub-Saharan Africa",
+    "GIN": "Sub-Saharan Africa", "GNB": "Sub-Saharan Africa", "KEN": "Sub-Saharan Africa",
+    "LSO": "Sub-Saharan Africa", "LBR": "Sub-Saharan Africa", "MDG": "Sub-Saharan Africa",
+    "MWI": "Sub-Saharan Africa", "MLI": "Sub-Saharan Africa", "MRT": "Sub-Saharan Africa",
+    "MUS": "Sub-Saharan Africa", "MYT": "Sub-Saharan Africa", "MOZ": "Sub-Saharan Africa",
+    "NAM": "Sub-Saharan Africa", "NER": "Sub-Saharan Africa", "NGA": "Sub-Saharan Africa",
+    "REU": "Sub-Saharan Africa", "RWA": "Sub-Saharan Africa", "SHN": "Sub-Saharan Africa",
+    "STP": "Sub-Saharan Africa", "SEN": "Sub-Saharan Africa", "SYC": "Sub-Saharan Africa",
+    "SLE": "Sub-Saharan Africa", "SOM": "Sub-Saharan Africa", "ZAF": "Sub-Saharan Africa",
+    "SSD": "Sub-Saharan Africa", "SDN": "Sub-Saharan Africa", "TZA": "Sub-Saharan Africa",
+    "TGO": "Sub-Saharan Africa", "UGA": "Sub-Saharan Africa", "ZMB": "Sub-Saharan Africa",
+    "ZWE": "Sub-Saharan Africa",
+
+    # --- RUSSIA & CENTRAL ASIA ---
+    "ARM": "Russia & Central Asia", "AZE": "Russia & Central Asia", "BLR": "Russia & Central Asia",
+    "GEO": "Russia & Central Asia", "KAZ": "Russia & Central Asia", "KGZ": "Russia & Central Asia",
+    "RUS": "Russia & Central Asia", "TJK": "Russia & Central Asia", "TKM": "Russia & Central Asia",
+    "UZB": "Russia & Central Asia",
+
+    # --- ANTARCTIC / OTHER ---
+    "ATA": "Antarctic", "BVT": "Antarctic", "HMD": "Antarctic", "ATF": "Antarctic",
+    "SGS": "Antarctic", "UMI": "Americas" # US Minor Outlying Islands
+}
+
+# Region names; a region's id is its position in this list
+REGION_NAMES: List[str] = list(dict.fromkeys(COUNTRY_TO_REGION.values()))
+
+# Country ids: a country's id is the position of its ISO3 code in COUNTRY_CODES
+COUNTRY_CODES: List[str] = sorted(COUNTRY_TO_REGION)
+COUNTRY_INDEX: Dict[str, int] = {iso: i for i, iso in enumerate(COUNTRY_CODES)}
+
+# Region id of every country id
+COUNTRY_REGION_IDS = np.array(
+    [REGION_NAMES.index(COUNTRY_TO_REGION[iso]) for iso in COUNTRY_CODES], dtype=np.int16
+)
+
+# Country groups (ISO3 members)
+COUNTRY_GROUPS: Dict[str, List[str]] = {
+    'ASEAN': ['BRN', 'KHM', 'IDN', 'LAO', 'MYS', 'MMR', 'PHL', 'SGP', 'THA', 'VNM'],
+    'QUAD': ['AUS', 'IND', 'JPN', 'USA'],
+    # Default alternative suppliers for the China-Plus-One score (CPODS)
+    'CPODS_ALTERNATIVES': ['USA', 'JPN', 'DEU', 'SGP', 'KOR',
+                           'ARE', 'AUS', 'GBR', 'FRA', 'ITA']
+}
+
+
+def country_ids(iso_codes: Iterable[str]) -> np.ndarray:
+    """
+    Encode ISO3 codes as country ids
+
+    Args:
+        iso_codes: ISO3 codes
+
+    Returns:
+        Integer array of country ids (-1 for codes not in the reference data)
+    """
+    return np.array([COUNTRY_INDEX.get(iso, -1) for iso in iso_codes], dtype=np.int32)
+
+
+def region_ids(iso_codes: Iterable[str]) -> np.ndarray:
+    """
+    Encode ISO3 codes as region ids
+
+    Args:
+        iso_codes: ISO3 codes
+
+    Returns:
+        Integer array of region ids (-1 for codes without a region)
+    """
+    ids = country_ids(iso_codes)
+    # Extra trailing -1 so that unknown countries (-1) map to no region
+    return np.append(COUNTRY_REGION_IDS, -1)[ids].astype(np.int32)
+
+
+def aggregate_by_region(values: np.ndarray, regions: np.ndarray) -> np.ndarray:
+    """
+    Sum values over countries into regions
+
+    Args:
+        values: Array whose last axis runs over countries, e.g. Year × Partner
+        regions: Region id of every country on that axis (-1 is skipped)
+
+    Returns:
+        Array with the last axis replaced by len(REGION_NAMES) regions
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mapped = regions >= 0
+
+    totals = np.zeros(values.shape[:-1] + (len(REGION_NAMES),))
+    np.add.at(np.moveaxis(totals, -1, 0), regions[mapped], np.moveaxis(values[..., mapped], -1, 0))
+    return totals
@@ -8,7 +8,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import logging
 from pathlib import Path
+from typing import Union
 from scipy import stats
+from src.trade_dataset import TradeDataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,12 +18,12 @@ logger = logging.getLogger(__name__)
 class SensitivityAnalyzer:
     """Run sensitivity checks for Nature revision"""
     
-    def __init__(self, data_path: str, output_dir: str = "output/derisking_analysis"):
-        self.data_path = Path(data_path)
+    def __init__(self, data_path: Union[str, TradeDataset], output_dir: str = "output/derisking_analysis"):
+        self.dataset = TradeDataset.coerce(data_path)
+        self.data_path = self.dataset.data_path
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.df = pd.read_csv(data_path)
-        self.df.columns = self.df.columns.str.strip()
+        self.df = self.dataset.df
         
         # Define Pandemic Goods (Original Strict Definition)
         self.pandemic_hs = ['22', '28', '29', '30', '34', '38', '39', '40', '62', '63', '65', '90']
@@ -60,8 +62,8 @@ class SensitivityAnalyzer:
     def _calculate_trend(self, excluded_codes, label):
         """Calculate TDI trend excluding specific codes"""
         # Filter Logic
-        # Convert ProductCode to string 2-digit matching
-        mask = ~self.df['ProductCode'].astype(str).str.pad(2, fillchar='0').isin(excluded_codes)
+        # Exclude every product under the given HS prefixes
+        mask = ~self.dataset.hs_mask(excluded_codes)
         subset = self.df[mask]
         
         # Get India Imports
@@ -71,7 +73,7 @@ class SensitivityAnalyzer:
             (subset['TradeFlowName'] == 'Export')
         ]
         
-        years = sorted(india_imports['Year'].unique())
+        years = sorted(int(y) for y in india_imports['Year'].unique())
         tdi_values = []
         
         for y in years:
@@ -123,8 +125,8 @@ class SensitivityAnalyzer:
         plt.savefig(self.output_dir / 'figures/figure9_sensitivity_hs29.png', dpi=300)
         logger.info("Saved Figure 9")
 
-def main():
-    analyzer = SensitivityAnalyzer('data/merged/consolidated_trade_data.csv')
+def main(data_path: Union[str, TradeDataset] = 'data/merged/consolidated_trade_data.csv'):
+    analyzer = SensitivityAnalyzer(data_path)
     analyzer.run_hs29_test()
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""
+Sparse Imports Module
+Sorted COO representation of India's imports for fine product granularity
+(HS4 / HS6), where a dense Year × Partner × Product cube would be mostly zeros
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional
+import logging
+from src.hs_index import HSIndex
+from src.profiler import count_rows
+from src.trade_schema import encode_column
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SparseImports:
+    """
+    India's import values as sorted COO arrays
+
+    Only (year, product, partner) cells with records are stored, sorted by
+    year, then product, then partner, so every year and every
+    (year, product) pair is a contiguous run. Per-product reductions are
+    segment sums over those runs: memory and time scale with the number
+    of non-zero flows, not with years × partners × products.
+    """
+
+    def __init__(self, imports: pd.DataFrame):
+        """
+        Build the COO arrays from India's import records
+
+        Args:
+            imports: Import records (Year, ReporterISO3, ProductCode and
+                TradeValue in 1000 USD columns)
+        """
+        count_rows(len(imports))
+
+        # Records without a year, partner or product cannot be placed
+        imports = imports.dropna(subset=['Year', 'ReporterISO3', 'ProductCode'])
+
+        self.years, year_codes = encode_column(imports['Year'])
+        self.partners, partner_codes = encode_column(imports['ReporterISO3'])
+        self.products, product_codes = encode_column(imports['ProductCode'])
+
+        self.years = self.years.astype(int)
+        self.partners = self.partners.astype(str)
+        self.products = self.products.astype(str)
+
+        n_partners = len(self.partners)
+        n_products = len(self.products)
+
+        # Sort order (year, product, partner); duplicate records are summed
+        keys = (year_codes.astype(np.int64) * n_products + product_codes) * n_partners + partner_codes
+        cells, inverse = np.unique(keys, return_inverse=True)
+        trade_values = imports['TradeValue in 1000 USD'].fillna(0.0).to_numpy(dtype=np.float64)
+
+        self.values = np.bincount(inverse, weights=trade_values, minlength=len(cells))
+        self.counts = np.bincount(inverse, minlength=len(cells)).astype(np.int32)
+        self.partner_idx = (cells % n_partners).astype(np.int32)
+        self.product_idx = ((cells // n_partners) % n_products).astype(np.int32)
+        self.year_idx = (cells // (n_partners * n_products)).astype(np.int32)
+
+        # Segment id of every cell: one segment per (year, product) with records
+        segment_keys = cells // n_partners
+        self.segment_keys, self.segment = np.unique(segment_keys, return_inverse=True)
+
+        # Label lookups, on the same axes as ImportCube
+        self.year_index = {int(year): i for i, year in enumerate(self.years)}
+        self.partner_index = {partner: i for i, partner in enumerate(self.partners)}
+        self.hs_index = HSIndex(pd.Index(self.products))
+
+        # Year × Product totals and supplier counts
+        self.product_totals = self._year_product_sum(self.values)
+        self.product_suppliers = self._year_product_sum(None).astype(np.int64)
+
+        logger.info(
+            f"Sparse imports built: {len(cells):,} non-zero cells "
+            f"({len(self.years)} years × {n_partners} partners × {n_products} products)"
+        )
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored (year, product, partner) cells"""
+        return len(self.values)
+
+    def year_pos(self, year: int) -> Optional[int]:
+        """Axis position of a year (None if absent)"""
+        return self.year_index.get(int(year))
+
+    def partner_pos(self, partner_iso: str) -> Optional[int]:
+        """Axis position of a partner ISO3 code (None if absent)"""
+        return self.partner_index.get(partner_iso)
+
+    def product_positions(self, product_codes: Iterable) -> List[int]:
+        """Axis positions of the products under any of the HS codes / prefixes"""
+        return self.hs_index.category_positions(product_codes).tolist()
+
+    def _year_product_sum(self, weights: Optional[np.ndarray], mask: np.ndarray = None) -> np.ndarray:
+        """Sum weights (None: count cells) into a dense Year × Product array"""
+        n_years, n_products = len(self.years), len(self.products)
+        keys = self.year_idx.astype(np.int64) * n_products + self.product_idx
+        if mask is not None:
+            keys = keys[mask]
+            weights = weights[mask] if weights is not None else None
+        return np.bincount(keys, weights=weights,
+                           minlength=n_years * n_products).reshape(n_years, n_products)
+
+    def partner_product_values(self, partner_iso: str) -> np.ndarray:
+        """
+        Year × Product imports from one partner
+
+        Args:
+            partner_iso: Partner ISO3 code
+
+        Returns:
+            Array of trade values (zeros if the partner has no records)
+        """
+        p = self.partner_pos(partner_iso)
+        if p is None:
+            return np.zeros((len(self.years), len(self.products)))
+        return self._year_product_sum(self.values, self.partner_idx == p)
+
+    def _segment_sum(self, weights: np.ndarray) -> np.ndarray:
+        """Sum weights over every (year, product) segment"""
+        return np.bincount(self.segment, weights=weights, minlength=len(self.segment_keys))
+
+    def product_stats(self, partner_iso: str = 'CHN') -> pd.DataFrame:
+        """
+        Per-product concentration of every year
+
+        Args:
+            partner_iso: Partner whose share is reported (default: CHN)
+
+        Returns:
+            DataFrame indexed by (Year, ProductCode) with Total_Imports,
+            Suppliers (partners with records), HHI (0-10000) and
+            Partner_Share (%), for products with records in that year
+        """
+        totals = self._segment_sum(self.values)
+        suppliers = np.bincount(self.segment, minlength=len(self.segment_keys))
+
+        # Cell shares within their segment; empty segments keep share 0
+        cell_totals = totals[self.segment]
+        shares = np.divide(self.values, cell_totals,
+                           out=np.zeros_like(self.values), where=cell_totals > 0)
+        hhi = self._segment_sum(shares ** 2) * 100 ** 2
+
+        partner = self.partner_index.get(partner_iso, -1)
+        partner_share = self._segment_sum(np.where(self.partner_idx == partner, shares, 0.0)) * 100
+
+        n_products = len(self.products)
+        index = pd.MultiIndex.from_arrays(
+            [self.years[self.segment_keys // n_products],
+             self.products[self.segment_keys % n_products]],
+            names=['Year', 'ProductCode']
+        )
+        return pd.DataFrame({
+            'Total_Imports': totals,
+            'Suppliers': suppliers,
+            'HHI': hhi,
+            'Partner_Share': partner_share
+        }, index=index)
@@ -10,6 +10,7 @@ from typing import Dict, List, Tuple
 from scipy import stats
 from scipy.stats import ttest_ind
 import logging
+from src.window_metrics import WindowAverages
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,8 +24,38 @@ class StatisticalAnalyzer:
     def __init__(self, metrics_summary_path: str):
         """Initialize with metrics summary CSV"""
         self.df = pd.read_csv(metrics_summary_path)
+        self._windows = {}
         logger.info(f"Loaded {len(self.df)} years of metrics data")
     
+    def window_means(self, metric: str, windows: List[Tuple[int, int]]) -> pd.Series:
+        """
+        Average of a metric over many (start_year, end_year) windows
+        
+        Each window is answered in O(1) from prefix sums of the yearly
+        values, so hundreds of window definitions are cheap.
+        
+        Args:
+            metric: Column of the metrics summary, e.g. 'TDI_China'
+            windows: (start_year, end_year) pairs, end inclusive
+            
+        Returns:
+            Series of window averages indexed by (start_year, end_year)
+        """
+        if metric not in self._windows:
+            self._windows[metric] = WindowAverages(self.df['Year'], self.df[metric])
+        
+        starts, ends = zip(*windows) if windows else ((), ())
+        return pd.Series(
+            self._windows[metric].means(starts, ends),
+            index=pd.MultiIndex.from_tuples(windows, names=['Start_Year', 'End_Year'])
+        )
+    
+    def rolling_means(self, metric: str, window: int = 3) -> pd.Series:
+        """Trailing k-year average of a metric, indexed by the window's last year"""
+        if metric not in self._windows:
+            self._windows[metric] = WindowAverages(self.df['Year'], self.df[metric])
+        return self._windows[metric].rolling(window)
+    
     def bootstrap_ci(self, data: np.ndarray, n_bootstrap: int = 1000, ci: float = 0.95) -> Tuple[float, float, float]:
         """
         Calculate bootstrap confidence intervals
@@ -273,8 +304,20 @@ class StatisticalAnalyzer:
         
         return results
     
-    def generate_statistical_report(self, period_results: Dict, trend_results: Dict, break_results: Dict) -> str:
-        """Generate comprehensive statistical report"""
+    def generate_statistical_report(self, period_results: Dict, trend_results: Dict, break_results: Dict,
+                                    rolling_results: Dict[str, Tuple[int, pd.Series]] = None) -> str:
+        """
+        Generate comprehensive statistical report
+        
+        Args:
+            period_results: Output of period_comparison_test
+            trend_results: Output of trend_analysis
+            break_results: Output of structural_break_test
+            rolling_results: Optional {metric: (window, rolling means)} from rolling_means
+            
+        Returns:
+            Markdown report
+        """
         report = []
         report.append("# Statistical Analysis Report")
         report.append("")
@@ -319,6 +362,19 @@ class StatisticalAnalyzer:
             report.append(f"- **Structural Break**: {'✅ YES' if results['structural_change'] else '❌ NO'}")
             report.append("")
         
+        if rolling_results:
+            report.append("## 4. Rolling Averages")
+            report.append("")
+            
+            for metric, (window, rolling) in rolling_results.items():
+                report.append(f"### {metric} ({window}-year trailing average)")
+                report.append("")
+                report.append("| Year | Average |")
+                report.append("|------|---------|")
+                for year, value in rolling.items():
+                    report.append(f"| {year} | {value:.2f} |")
+                report.append("")
+        
         return "\n".join(report)
 
 
@@ -330,9 +386,15 @@ def main():
     period_results = analyzer.period_comparison_test()
     trend_results = analyzer.trend_analysis()
     break_results = analyzer.structural_break_test(break_year=2020)
+    window = 3
+    rolling_results = {
+        metric: (window, analyzer.rolling_means(metric, window=window))
+        for metric in ['TDI_China', 'HHI', 'SCRS']
+    }
     
     # Generate report
-    report = analyzer.generate_statistical_report(period_results, trend_results, break_results)
+    report = analyzer.generate_statistical_report(period_results, trend_results, break_results,
+                                                  rolling_results)
     
     # Save report
     output_path = Path('output/derisking_analysis/statistical_analysis_report.md')
@@ -0,0 +1,270 @@
+"""
+Trade Dataset Module
+Shared in-process session holding the trade records of one pipeline run
+"""
+
+import hashlib
+import weakref
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+import logging
+from src.hs_index import HSIndex
+from src.profiler import count_rows
+from src.trade_schema import CATEGORICAL_COLUMNS, NUMERIC_DTYPES, apply_trade_schema
+from src.trade_store import read_trade_data
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _value_hashes(values: pd.Series) -> np.ndarray:
+    """
+    Hash every value of a column independently of its dtype
+
+    Codes and names are hashed as text (categoricals once per category),
+    numbers as float64, so CSV and Parquet loads of the same records agree.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        labels = values.cat.categories.astype(str).to_numpy(dtype=object)
+        # Extra trailing label so that missing values (code -1) hash as 'nan'
+        label_hashes = pd.util.hash_array(np.append(labels, 'nan').astype(object))
+        return label_hashes[values.cat.codes.to_numpy()]
+    if values.name in NUMERIC_DTYPES:
+        return pd.util.hash_array(values.astype('float64').to_numpy())
+    return pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+
+
+class TradeDataset:
+    """
+    Trade records loaded once and shared by every analyzer
+
+    Analyzer constructors accept either a path (CSV or TradeStore
+    directory) or a TradeDataset; passing the same TradeDataset to all of
+    them means the data is parsed once per pipeline run. Analyzers must
+    treat the frame as read-only.
+    """
+
+    def __init__(self, data_path: Union[str, Path, None] = None,
+                 df: Optional[pd.DataFrame] = None):
+        """
+        Load trade records
+
+        Args:
+            data_path: Path to consolidated CSV file or TradeStore directory
+            df: Already loaded trade records (used instead of data_path)
+        """
+        if df is None and data_path is None:
+            raise ValueError("TradeDataset needs a data_path or a DataFrame")
+
+        self.data_path = Path(data_path) if data_path is not None else None
+
+        if df is None:
+            df = read_trade_data(self.data_path)
+            count_rows(len(df))
+            logger.info(f"TradeDataset loaded {len(df):,} records from {self.data_path}")
+        else:
+            df = apply_trade_schema(df)
+
+        self._df = df
+        self._reset_views()
+
+        # Callbacks run when the records are replaced
+        self._change_listeners = []
+
+    def _reset_views(self):
+        """Derived views, built on first use"""
+        self._india_imports = None
+        self._import_year_bounds = None
+        self._india_exports = None
+        self._hs_index = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame,
+                   data_path: Union[str, Path, None] = None) -> 'TradeDataset':
+        """Wrap already loaded trade records"""
+        return cls(data_path=data_path, df=df)
+
+    @classmethod
+    def coerce(cls, data: Union[str, Path, 'TradeDataset']) -> 'TradeDataset':
+        """
+        Return data itself if it is a TradeDataset, otherwise load it
+
+        Args:
+            data: Path to consolidated CSV / TradeStore, or a TradeDataset
+
+        Returns:
+            TradeDataset
+        """
+        if isinstance(data, cls):
+            return data
+        return cls(data)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """All trade records"""
+        return self._df
+
+    def add_change_listener(self, callback: Callable[[], None]):
+        """
+        Register a callback to run after the records are replaced
+
+        Bound methods are held weakly, so registering an analyzer does not
+        keep it alive.
+
+        Args:
+            callback: Function taking no arguments, e.g. a cache invalidation
+        """
+        if hasattr(callback, '__self__'):
+            self._change_listeners.append(weakref.WeakMethod(callback))
+        else:
+            self._change_listeners.append(lambda: callback)
+
+    def replace(self, df: pd.DataFrame):
+        """
+        Replace the trade records (e.g. after re-ingesting changed archives)
+
+        Derived views are rebuilt on next use and every change listener is
+        notified so that cached results computed from the old records are
+        dropped.
+
+        Args:
+            df: New trade records
+        """
+        self._df = apply_trade_schema(df)
+        self._reset_views()
+
+        live_listeners = []
+        for ref in self._change_listeners:
+            callback = ref()
+            if callback is not None:
+                callback()
+                live_listeners.append(ref)
+        self._change_listeners = live_listeners
+
+        logger.info(f"TradeDataset replaced: {len(self._df):,} records")
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    @property
+    def india_imports(self) -> pd.DataFrame:
+        """
+        India's imports, sorted by Year
+
+        India as partner with TradeFlowName = Export means the reporter is
+        exporting TO India, i.e. India importing FROM the reporter. Built
+        once with a single mask over all rows; within a year the original
+        row order is kept.
+        """
+        if self._india_imports is None:
+            df = self._df
+            count_rows(len(df))
+            mask = (df['PartnerISO3'] == 'IND') & (df['TradeFlowName'] == 'Export')
+            imports = df[mask].sort_values('Year', kind='stable').reset_index(drop=True)
+
+            # Contiguous row range of every year
+            years = imports['Year'].to_numpy()
+            unique_years = np.unique(years)
+            starts = np.searchsorted(years, unique_years, side='left')
+            stops = np.searchsorted(years, unique_years, side='right')
+
+            self._import_year_bounds = {
+                int(year): (int(start), int(stop))
+                for year, start, stop in zip(unique_years, starts, stops)
+            }
+            self._india_imports = imports
+
+        return self._india_imports
+
+    @property
+    def india_exports(self) -> pd.DataFrame:
+        """
+        India's exports as reported by India (ReporterISO3 = IND, Export)
+
+        The mirror of india_imports; empty when the data only holds
+        partner-reported flows with India.
+        """
+        if self._india_exports is None:
+            df = self._df
+            count_rows(len(df))
+            mask = (df['ReporterISO3'] == 'IND') & (df['TradeFlowName'] == 'Export')
+            self._india_exports = df[mask].reset_index(drop=True)
+        return self._india_exports
+
+    @property
+    def import_year_bounds(self) -> Dict[int, Tuple[int, int]]:
+        """Mapping of year to its (start, stop) row range in india_imports"""
+        if self._import_year_bounds is None:
+            self.india_imports   # builds the view and its year bounds
+        return self._import_year_bounds
+
+    def import_year_fingerprints(self) -> Dict[int, str]:
+        """
+        SHA-256 fingerprint of every year's import records
+
+        Computed from per-row content hashes of india_imports, so a year's
+        fingerprint changes whenever any of its import records is added,
+        removed or revised. Rows are hashed over the schema columns in a
+        fixed order and with fixed types, and sorted within the year, so
+        the same records give the same fingerprint whichever loader (CSV
+        or TradeStore) produced them.
+
+        Returns:
+            Mapping of year to hex digest
+        """
+        imports = self.india_imports
+        count_rows(len(imports))
+
+        columns = [col for col in list(CATEGORICAL_COLUMNS) + list(NUMERIC_DTYPES)
+                   if col in imports.columns]
+        value_hashes = pd.DataFrame({col: _value_hashes(imports[col]) for col in columns})
+        row_hashes = pd.util.hash_pandas_object(value_hashes, index=False).to_numpy()
+        return {
+            year: hashlib.sha256(np.sort(row_hashes[start:stop]).tobytes()).hexdigest()
+            for year, (start, stop) in self.import_year_bounds.items()
+        }
+
+    def india_imports_for_year(self, year: int) -> pd.DataFrame:
+        """
+        India's imports of one year
+
+        A positional slice of india_imports (no mask, no copy); treat it as
+        read-only.
+
+        Args:
+            year: Year to select
+
+        Returns:
+            DataFrame of that year's import records (empty if none)
+        """
+        start, stop = self.import_year_bounds.get(int(year), (0, 0))
+        return self.india_imports.iloc[start:stop]
+
+    @property
+    def hs_index(self) -> HSIndex:
+        """HS prefix index over the ProductCode categories"""
+        if self._hs_index is None:
+            self._hs_index = HSIndex.from_series(self._df['ProductCode'])
+        return self._hs_index
+
+    def hs_mask(self, prefixes: Iterable, frame: Optional[pd.DataFrame] = None) -> np.ndarray:
+        """
+        Rows whose ProductCode falls under any of the HS prefixes
+
+        Every module filters products through this method, so a basket of
+        chapters / headings / subheadings selects the same records
+        everywhere.
+
+        Args:
+            prefixes: HS codes or prefixes, e.g. ['85'] or ['30', '3822']
+            frame: Records to mask (default: all records); views of the
+                dataset such as india_imports share its categories
+
+        Returns:
+            Boolean array aligned with the frame's rows
+        """
+        frame = self._df if frame is None else frame
+        count_rows(len(frame))
+        return self.hs_index.mask(frame['ProductCode'], prefixes)
@@ -0,0 +1,155 @@
+"""
+Trade Schema Module
+Canonical column types for trade records, applied at load time
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Callable, Tuple
+
+
+# Repeated string codes and names: stored once per distinct value
+CATEGORICAL_COLUMNS = [
+    'Nomenclature',
+    'ReporterISO3',
+    'ReporterName',
+    'PartnerISO3',
+    'PartnerName',
+    'TradeFlowName',
+    'ProductCode'
+]
+
+NUMERIC_DTYPES = {
+    'Year': 'int16',
+    'TradeFlowCode': 'int8',
+    'TradeValue in 1000 USD': 'float64'
+}
+
+# dtypes passed to pd.read_csv; ProductCode is read as text so that
+# leading zeros ("07") survive and is normalized afterwards
+CSV_DTYPES = {
+    **{col: 'category' for col in CATEGORICAL_COLUMNS if col != 'ProductCode'},
+    'ProductCode': str,
+    **NUMERIC_DTYPES
+}
+
+
+def normalize_hs_code(code) -> str:
+    """
+    Normalize one HS product code to its zero-padded text form
+
+    HS codes have an even number of digits (2 = chapter, 4 = heading,
+    6 = subheading); integer-parsed codes lose their leading zero,
+    e.g. 7 -> "07", 80510 -> "080510".
+
+    Args:
+        code: Product code as int, float or str
+
+    Returns:
+        Normalized code
+    """
+    if isinstance(code, (float, np.floating)) and float(code).is_integer():
+        code = int(code)
+    text = str(code).strip()
+    if text.isdigit() and len(text) % 2 == 1:
+        text = '0' + text
+    return text
+
+
+def _recode_categories(series: pd.Series, func: Callable) -> pd.Series:
+    """
+    Apply func to the distinct values of a series and return a categorical
+
+    Only the categories are transformed, so the cost does not depend on the
+    number of rows. Categories that collapse onto the same label are merged.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+
+    old_labels = series.cat.categories
+    new_labels = [func(label) for label in old_labels]
+    categories = sorted(set(new_labels))
+    position = {label: i for i, label in enumerate(categories)}
+
+    code_map = np.array([position[label] for label in new_labels] + [-1], dtype=np.int32)
+    codes = code_map[series.cat.codes.to_numpy()]   # -1 (missing) maps to -1
+
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=series.index,
+        name=series.name
+    )
+
+
+def encode_column(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Integer-code a column, keeping only the values that occur
+
+    Args:
+        values: Column to encode (categorical or plain)
+
+    Returns:
+        (labels, codes): sorted distinct labels and each row's position in them
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Work on the (few) category codes rather than the row labels
+        observed, codes = np.unique(values.cat.codes.to_numpy(), return_inverse=True)
+        labels = values.cat.categories.to_numpy()[observed]
+        return labels, codes
+    labels, codes = np.unique(values.to_numpy(), return_inverse=True)
+    return labels, codes
+
+
+def apply_trade_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert trade records to the canonical schema (in place)
+
+    - Code and name columns become categoricals
+    - ProductCode becomes a categorical of zero-padded HS code strings
+    - Year / TradeFlowCode become compact integers, trade values float64
+
+    Columns not in the schema are left unchanged.
+
+    Args:
+        df: Trade records
+
+    Returns:
+        The same DataFrame, converted
+    """
+    df.columns = df.columns.str.strip()
+
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        if col == 'ProductCode':
+            df[col] = _recode_categories(df[col], normalize_hs_code)
+        elif not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    for col, dtype in NUMERIC_DTYPES.items():
+        if col in df.columns and df[col].dtype != dtype:
+            if dtype.startswith('int') and df[col].isnull().any():
+                continue   # Missing values cannot be held by numpy ints
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+
+def read_trade_csv(csv_path) -> pd.DataFrame:
+    """
+    Read a trade CSV straight into the canonical schema
+
+    Args:
+        csv_path: Path or file handle of the CSV
+
+    Returns:
+        DataFrame in the canonical schema
+    """
+    try:
+        df = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+    except (ValueError, TypeError):
+        # e.g. missing Year values cannot be parsed as int16
+        if hasattr(csv_path, 'seek'):
+            csv_path.seek(0)
+        df = pd.read_csv(csv_path)
+    return apply_trade_schema(df)
@@ -0,0 +1,160 @@
+"""
+Trade Store Module
+Columnar (Parquet) store of trade records, partitioned by Year and TradeFlowName
+"""
+
+import shutil
+import pandas as pd
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+import logging
+from src.trade_schema import apply_trade_schema, read_trade_csv
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TradeStore:
+    """
+    Partitioned Parquet store replacing consolidated_trade_data.csv
+
+    Layout: <store_dir>/Year=<year>/TradeFlowName=<flow>/*.parquet, so
+    reading one flow for a year range only touches those partitions.
+    Requires pyarrow.
+    """
+
+    PARTITION_COLS = ['Year', 'TradeFlowName']
+
+    def __init__(self, store_dir: str = "data/merged/trade_store"):
+        """
+        Initialize the store
+
+        Args:
+            store_dir: Root directory of the partitioned store
+        """
+        self.store_dir = Path(store_dir)
+
+    def exists(self) -> bool:
+        """Whether the store has been written"""
+        return self.store_dir.is_dir() and any(self.store_dir.iterdir())
+
+    def write(self, df: pd.DataFrame) -> Path:
+        """
+        Write all records, replacing any existing store
+
+        Args:
+            df: Trade records
+
+        Returns:
+            Path to the store directory
+        """
+        if self.store_dir.exists():
+            shutil.rmtree(self.store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        df.to_parquet(self.store_dir, partition_cols=self.PARTITION_COLS, index=False)
+
+        logger.info(f"✓ Wrote {len(df):,} rows to trade store: {self.store_dir}")
+        return self.store_dir
+
+    def replace_partitions(self, df: pd.DataFrame) -> Path:
+        """
+        Rewrite only the (Year, TradeFlowName) partitions present in df
+
+        Partitions not present in df are left untouched.
+
+        Args:
+            df: Complete records for every partition being replaced
+
+        Returns:
+            Path to the store directory
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        df.to_parquet(
+            self.store_dir,
+            partition_cols=self.PARTITION_COLS,
+            index=False,
+            existing_data_behavior='delete_matching'
+        )
+
+        years = sorted(df['Year'].unique().tolist())
+        logger.info(f"✓ Replaced trade store partitions for years {years}")
+        return self.store_dir
+
+    def delete_years(self, years: Iterable[int]) -> int:
+        """
+        Remove all partitions of the given years
+
+        Args:
+            years: Years to remove
+
+        Returns:
+            Number of year partitions removed
+        """
+        removed = 0
+        for year in years:
+            year_dir = self.store_dir / f"Year={year}"
+            if year_dir.exists():
+                shutil.rmtree(year_dir)
+                removed += 1
+        return removed
+
+    def years(self) -> List[int]:
+        """List the years present in the store"""
+        if not self.store_dir.exists():
+            return []
+        return sorted(
+            int(p.name.split('=', 1)[1])
+            for p in self.store_dir.glob("Year=*") if p.is_dir()
+        )
+
+    def read(self, years: Optional[Iterable[int]] = None,
+             flows: Optional[Iterable[str]] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read records, touching only the matching partitions
+
+        Args:
+            years: Years to load (default: all)
+            flows: TradeFlowName values to load, e.g. ['Export'] (default: all)
+            columns: Columns to load (default: all)
+
+        Returns:
+            DataFrame of trade records in the canonical trade schema
+        """
+        filters = []
+        if years is not None:
+            filters.append(('Year', 'in', [int(y) for y in years]))
+        if flows is not None:
+            filters.append(('TradeFlowName', 'in', list(flows)))
+
+        df = pd.read_parquet(
+            self.store_dir,
+            columns=columns,
+            filters=filters or None
+        )
+
+        # Partition columns come back as categoricals of the directory values
+        if 'Year' in df.columns:
+            df['Year'] = df['Year'].astype(str).astype('int64')
+
+        return apply_trade_schema(df)
+
+
+def read_trade_data(data_path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Load trade records from a consolidated CSV or a partitioned TradeStore
+
+    Args:
+        data_path: Path to consolidated CSV file or TradeStore directory
+
+    Returns:
+        DataFrame of trade records in the canonical trade schema
+        (see src.trade_schema)
+    """
+    data_path = Path(data_path)
+
+    if data_path.is_dir():
+        return TradeStore(data_path).read()
+    return read_trade_csv(data_path)
@@ -0,0 +1,81 @@
+"""
+Window Metrics Module
+Multi-year window averages of yearly metric series, answered from prefix sums
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Iterable, Tuple
+
+
+class WindowAverages:
+    """
+    Average of a yearly series over any window of years in O(1)
+
+    Cumulative sums of the values (and of the number of years with a
+    value) are built once over a contiguous year axis; the average over
+    start..end is then two lookups and a division. Years without a value
+    are skipped rather than counted as 0.
+    """
+
+    def __init__(self, years: Iterable[int], values: Iterable[float]):
+        """
+        Build the prefix sums
+
+        Args:
+            years: Years of the series
+            values: Metric value of every year (NaN = no value)
+        """
+        series = pd.Series(np.asarray(values, dtype=np.float64),
+                           index=np.asarray(years, dtype=int)).sort_index()
+
+        self.first_year = int(series.index.min()) if len(series) else 0
+        self.last_year = int(series.index.max()) if len(series) else -1
+
+        # Contiguous year axis; gaps hold NaN
+        axis = np.arange(self.first_year, self.last_year + 1)
+        full = series.reindex(axis).to_numpy()
+        present = ~np.isnan(full)
+
+        # prefix[i] = sum of the first i years on the axis
+        self._sums = np.concatenate([[0.0], np.cumsum(np.where(present, full, 0.0))])
+        self._counts = np.concatenate([[0], np.cumsum(present)])
+
+    def _bounds(self, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Prefix positions of window bounds, clipped to the year axis"""
+        lo = np.clip(starts - self.first_year, 0, len(self._sums) - 1)
+        hi = np.clip(ends - self.first_year + 1, 0, len(self._sums) - 1)
+        return lo, np.maximum(hi, lo)
+
+    def means(self, starts: Iterable[int], ends: Iterable[int]) -> np.ndarray:
+        """
+        Averages over many windows at once
+
+        Args:
+            starts: First year of every window
+            ends: Last year of every window (inclusive)
+
+        Returns:
+            Array of window averages (NaN for windows without values)
+        """
+        lo, hi = self._bounds(np.asarray(starts, dtype=int), np.asarray(ends, dtype=int))
+        counts = self._counts[hi] - self._counts[lo]
+        sums = self._sums[hi] - self._sums[lo]
+        return np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+
+    def mean(self, start_year: int, end_year: int) -> float:
+        """Average over start_year..end_year (inclusive)"""
+        return float(self.means([start_year], [end_year])[0])
+
+    def rolling(self, window: int) -> pd.Series:
+        """
+        Trailing k-year averages
+
+        Args:
+            window: Number of years per window
+
+        Returns:
+            Series of averages indexed by the last year of each window
+        """
+        ends = np.arange(self.first_year + window - 1, self.last_year + 1)
+        return pd.Series(self.means(ends - window + 1, ends), index=pd.Index(ends, name='Year'))
@@ -0,0 +1,138 @@
+"""
+Tests for ZIP ingest: streaming, incremental manifest, partitions and
+append / rewrite of the consolidated CSV
+"""
+
+import json
+import zipfile
+
+import pandas as pd
+import pytest
+
+from src.data_processor import DataProcessor
+from src.trade_schema import read_trade_csv
+
+
+COLUMNS = ['Nomenclature', 'ReporterISO3', 'ProductCode', 'ReporterName',
+           'PartnerISO3', 'PartnerName', 'Year', 'TradeFlowName',
+           'TradeFlowCode', 'TradeValue in 1000 USD']
+
+
+def _records(reporter: str, year: int, n: int) -> pd.DataFrame:
+    """n export records of one reporter to India"""
+    return pd.DataFrame({
+        'Nomenclature': 'H3',
+        'ReporterISO3': reporter,
+        'ProductCode': [f"{(i % 97) + 1:02d}" for i in range(n)],
+        'ReporterName': reporter,
+        'PartnerISO3': 'IND',
+        'PartnerName': 'India',
+        'Year': year,
+        'TradeFlowName': 'Export',
+        'TradeFlowCode': 6,
+        'TradeValue in 1000 USD': [float(i + 1) for i in range(n)],
+    }, columns=COLUMNS)
+
+
+def _write_zip(path, df: pd.DataFrame):
+    """ZIP archive with one CSV member, like the WITS downloads"""
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr(f"DataJobID-{path.stem}.csv", df.to_csv(index=False))
+
+
+@pytest.fixture
+def processor(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    return DataProcessor(data_dir=str(raw), output_dir=str(tmp_path / "merged"))
+
+
+def _consolidated(processor) -> pd.DataFrame:
+    return read_trade_csv(processor.output_dir / "consolidated_trade_data.csv")
+
+
+def test_incremental_append_matches_full_rewrite(processor):
+    _write_zip(processor.data_dir / "A.ZIP", _records('BEL', 2015, 30))
+    _write_zip(processor.data_dir / "B.ZIP", _records('CHN', 2016, 40))
+    processor.ingest_incremental()
+    assert len(_consolidated(processor)) == 70
+
+    _write_zip(processor.data_dir / "C.ZIP", _records('USA', 2017, 50))
+    processor.ingest_incremental()
+
+    manifest = processor.load_manifest()
+    assert [a['file'] for a in manifest['archives']] == ['A.ZIP', 'B.ZIP', 'C.ZIP']
+    assert manifest['total_rows'] == 120
+    assert len(_consolidated(processor)) == 120
+    assert (processor.partitions_dir / "C.pkl").exists()
+
+
+def test_incremental_rewrites_when_csv_was_rebuilt_elsewhere(processor):
+    _write_zip(processor.data_dir / "A.ZIP", _records('BEL', 2015, 30))
+    _write_zip(processor.data_dir / "B.ZIP", _records('CHN', 2016, 40))
+    processor.ingest_incremental()
+
+    # A third archive arrives and another ingest mode rebuilds the CSV
+    _write_zip(processor.data_dir / "C.ZIP", _records('USA', 2017, 50))
+    assert processor.stream_zip_files() is not None
+    assert len(_consolidated(processor)) == 120
+
+    # Appending C again would duplicate its rows
+    processor.ingest_incremental()
+    df = _consolidated(processor)
+    assert len(df) == 120
+    assert not df.duplicated().any()
+
+
+def test_incremental_replaces_changed_and_removed_archives(processor):
+    _write_zip(processor.data_dir / "A.ZIP", _records('BEL', 2015, 30))
+    _write_zip(processor.data_dir / "B.ZIP", _records('CHN', 2016, 40))
+    processor.ingest_incremental()
+
+    _write_zip(processor.data_dir / "A.ZIP", _records('BEL', 2015, 10))
+    (processor.data_dir / "B.ZIP").unlink()
+    processor.ingest_incremental()
+
+    df = _consolidated(processor)
+    assert len(df) == 10
+    assert set(df['ReporterISO3'].astype(str)) == {'BEL'}
+    assert not (processor.partitions_dir / "B.pkl").exists()
+
+    with open(processor.manifest_path) as f:
+        manifest = json.load(f)
+    assert [a['file'] for a in manifest['archives']] == ['A.ZIP']
+    assert manifest['archives'][0]['rows'] == 10
+
+
+def test_stream_reads_archive_with_blank_year(processor):
+    records = _records('BEL', 2015, 30)
+    records['Year'] = records['Year'].astype(object)
+    records.loc[12, 'Year'] = None
+    _write_zip(processor.data_dir / "A.ZIP", records)
+
+    output_path = processor.stream_zip_files(chunksize=10)
+    assert output_path is not None
+
+    streamed = _consolidated(processor)
+    loaded = processor.load_zip_files(workers=1)
+    assert len(streamed) == len(loaded) == 30
+    assert streamed['Year'].isna().sum() == 1
+    assert streamed['Year'].dropna().eq(2015).all()
+
+
+def test_stream_aborts_without_touching_output_on_bad_archive(processor):
+    _write_zip(processor.data_dir / "A.ZIP", _records('BEL', 2015, 30))
+    output_path = processor.stream_zip_files()
+    before = output_path.read_bytes()
+
+    # B is corrupt near its end: its first chunks parse, then the CRC check fails
+    bad_path = processor.data_dir / "B.ZIP"
+    with zipfile.ZipFile(bad_path, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr("DataJobID-B.csv", _records('CHN', 2016, 20000).to_csv(index=False))
+    raw = bad_path.read_bytes()
+    at = raw.rfind(b'CHN,')
+    bad_path.write_bytes(raw[:at] + b'CHX,' + raw[at + 4:])
+
+    assert processor.stream_zip_files(chunksize=1000) is None
+    assert output_path.read_bytes() == before
+    assert not list(processor.output_dir.glob("*.tmp"))
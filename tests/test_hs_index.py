@@ -0,0 +1,34 @@
+"""
+Tests for HS prefix lookups
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.hs_index import HSIndex
+
+
+CODES = ['070190', '080510', '851712', '851830', '854231', '8517']
+
+
+def test_odd_length_prefix_is_matched_as_written():
+    index = HSIndex(pd.Index(CODES))
+
+    assert index.codes(['851']) == ['851712', '851830', '8517']
+    assert index.codes(['85171']) == ['851712']
+    assert index.codes(['085']) == []
+
+
+def test_numeric_codes_are_normalized():
+    index = HSIndex(pd.Index(CODES))
+
+    assert index.codes([7]) == ['070190']
+    assert index.codes([80510.0]) == ['080510']
+    assert index.codes(['85', 8542]) == ['851712', '851830', '854231', '8517']
+
+
+def test_mask_selects_rows_under_prefix():
+    codes = pd.Series(['851712', '070190', '851830', '854231'], dtype='category')
+    index = HSIndex.from_series(codes)
+
+    np.testing.assert_array_equal(index.mask(codes, ['851']), [True, False, True, False])
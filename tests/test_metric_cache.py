@@ -0,0 +1,43 @@
+"""
+Tests for metric memoization
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.metric_cache import MetricCache, cached_metric
+
+
+class Metrics:
+    """Minimal calculator with a metric cache"""
+
+    def __init__(self):
+        self.cache = MetricCache()
+        self.calls = 0
+
+    @cached_metric
+    def table(self, year: int) -> pd.DataFrame:
+        self.calls += 1
+        return pd.DataFrame({'Year': [year], 'Value': [1.0]})
+
+    @cached_metric
+    def shares(self, year: int) -> dict:
+        self.calls += 1
+        return {'CHN': 10.0, 'matrix': np.ones(3)}
+
+
+def test_modifying_a_result_does_not_change_later_hits():
+    metrics = Metrics()
+
+    table = metrics.table(2015)
+    table['Value'] = 99.0
+    table.loc[1] = [2016, 5.0]
+    shares = metrics.shares(2015)
+    shares['CHN'] = 0.0
+    shares['matrix'][:] = 0.0
+
+    pd.testing.assert_frame_equal(metrics.table(2015), pd.DataFrame({'Year': [2015], 'Value': [1.0]}))
+    assert metrics.shares(2015)['CHN'] == 10.0
+    np.testing.assert_array_equal(metrics.shares(year=2015)['matrix'], np.ones(3))
+    assert metrics.calls == 2
+    assert metrics.cache.stats()['hits'] == 3
@@ -0,0 +1,127 @@
+"""
+Tests for the vectorized metric tables against the per-year scalar metrics
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics_calculator import DeriskingMetrics
+from src.reference_data import COUNTRY_GROUPS
+from src.trade_dataset import TradeDataset
+from src.trade_schema import apply_trade_schema
+
+
+YEARS = [2014, 2015, 2018, 2022]
+PARTNERS = ['CHN', 'USA', 'JPN', 'DEU', 'VNM', 'SGP', 'AUS']
+
+
+@pytest.fixture
+def records() -> pd.DataFrame:
+    """India's imports (partner-reported) and exports (India-reported)"""
+    rng = np.random.default_rng(11)
+    n = 600
+    imports = pd.DataFrame({
+        'ReporterISO3': rng.choice(PARTNERS, n),
+        'PartnerISO3': 'IND',
+        'ProductCode': rng.choice(['01', '27', '29', '84', '85', '90'], n),
+        'Year': rng.choice(YEARS, n),
+    })
+    exports = pd.DataFrame({
+        'ReporterISO3': 'IND',
+        'PartnerISO3': rng.choice(PARTNERS[:-1], n // 2),
+        'ProductCode': rng.choice(['30', '52', '71'], n // 2),
+        'Year': rng.choice(YEARS, n // 2),
+    })
+    df = pd.concat([imports, exports], ignore_index=True)
+    df['Nomenclature'] = 'H3'
+    df['ReporterName'] = df['ReporterISO3']
+    df['PartnerName'] = df['PartnerISO3']
+    df['TradeFlowName'] = 'Export'
+    df['TradeFlowCode'] = 6
+    df['TradeValue in 1000 USD'] = rng.uniform(0, 500, len(df)).round(3)
+    return apply_trade_schema(df)
+
+
+@pytest.fixture
+def calculator(records) -> DeriskingMetrics:
+    return DeriskingMetrics(TradeDataset.from_frame(records))
+
+
+def test_cpods_matrices_match_calculate_cpods(calculator):
+    groups = {name: COUNTRY_GROUPS[name] for name in ['CPODS_ALTERNATIVES', 'ASEAN', 'QUAD']}
+    matrices = calculator.cpods_matrices(groups, YEARS + [2030])
+
+    for name, partners in groups.items():
+        for baseline, current in [(2014, 2022), (2015, 2018), (2022, 2015), (2015, 2030)]:
+            expected = calculator.calculate_cpods(baseline, current, partners)
+            assert matrices[name].at[baseline, current] == pytest.approx(expected)
+
+
+def test_dmsi_table_matches_calculate_dmsi_proxy(calculator):
+    for baseline, current in [(2015, 2022), (2014, 2018), (2015, 2030)]:
+        table = calculator.dmsi_table(baseline, current)
+        for product in ['01', '27', '85', '90']:
+            assert table.at[product, 'Baseline_Imports'] == pytest.approx(
+                calculator._get_product_imports(product, baseline))
+            assert table.at[product, 'DMSI'] == pytest.approx(
+                calculator.calculate_dmsi_proxy(product, baseline, current))
+
+
+def test_rank_dmsi_orders_products_by_substitution(calculator):
+    ranking = calculator.rank_dmsi(2015, 2022, top=None)
+    dmsi = {product: calculator.calculate_dmsi_proxy(product, 2015, 2022)
+            for product in ranking['substituted'].index}
+
+    assert list(ranking['substituted'].index) == sorted(dmsi, key=dmsi.get, reverse=True)
+    assert list(ranking['newly_dependent'].index) == sorted(dmsi, key=dmsi.get)
+    assert len(calculator.rank_dmsi(2015, 2022, top=2)['substituted']) == 2
+
+
+def test_tbii_by_partner_matches_calculate_tbii(calculator, records):
+    value = 'TradeValue in 1000 USD'
+    exports = records['TradeFlowName'] == 'Export'
+
+    def deficit(year, partner):
+        imports = records.loc[exports & (records['Year'] == year) &
+                              (records['ReporterISO3'] == partner) &
+                              (records['PartnerISO3'] == 'IND'), value].sum()
+        sales = records.loc[exports & (records['Year'] == year) &
+                            (records['ReporterISO3'] == 'IND') &
+                            (records['PartnerISO3'] == partner), value].sum()
+        return imports - sales
+
+    for baseline in [2014, 2015]:
+        tbii = calculator.tbii_by_partner(baseline, YEARS + [2030], PARTNERS + ['KOR'])
+        for partner in ['CHN', 'AUS', 'KOR']:
+            for current in [2018, 2022, 2030]:
+                expected = calculator.calculate_tbii(baseline, current, partner)
+                assert tbii.at[current, partner] == pytest.approx(expected)
+
+                base = deficit(baseline, partner)
+                direct = (base - deficit(current, partner)) / base * 100 if base != 0 else 0.0
+                assert tbii.at[current, partner] == pytest.approx(direct)
+
+
+def test_product_imports_sum_subheadings_under_a_coarser_code(records):
+    # HS6 records: two subheadings of chapter 85 and one of chapter 84
+    hs6 = records[records['PartnerISO3'] == 'IND'].head(3).copy()
+    hs6['ProductCode'] = ['851712', '854231', '847130']
+    hs6['Year'] = 2015
+    hs6['TradeValue in 1000 USD'] = [200.0, 600.0, 50.0]
+    current = hs6.assign(Year=2022, **{'TradeValue in 1000 USD': [100.0, 300.0, 50.0]})
+    calculator = DeriskingMetrics(TradeDataset.from_frame(
+        apply_trade_schema(pd.concat([hs6, current], ignore_index=True))))
+
+    assert calculator._get_product_imports('85', 2015) == pytest.approx(800.0)
+    assert calculator._get_product_imports('8517', 2015) == pytest.approx(200.0)
+    assert calculator.calculate_dmsi_proxy('85', 2015, 2022) == pytest.approx(0.5)
+
+
+def test_scrs_window_averages_use_the_given_weights(calculator):
+    weights = {'w1': 0.2, 'w2': 0.5, 'w3': 0.3}
+    yearly = [calculator.calculate_scrs(year, **weights) for year in [2014, 2015, 2018]]
+
+    assert calculator.calculate_window_average('SCRS', 2014, 2018, **weights) == pytest.approx(np.mean(yearly))
+    assert calculator.calculate_rolling('SCRS', 5, **weights).loc[2018] == pytest.approx(np.mean(yearly))
+    assert calculator.calculate_window_average('SCRS', 2014, 2018) != pytest.approx(np.mean(yearly))
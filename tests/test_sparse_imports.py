@@ -0,0 +1,111 @@
+"""
+Tests for the sparse import representation and the import cube against
+plain pandas groupbys of the records
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.import_cube import ImportCube
+from src.metric_registry import METRICS
+from src.metrics_calculator import DeriskingMetrics
+from src.sparse_imports import SparseImports
+from src.trade_dataset import TradeDataset
+from src.trade_schema import apply_trade_schema
+
+
+VALUE = 'TradeValue in 1000 USD'
+
+
+@pytest.fixture
+def imports() -> pd.DataFrame:
+    """India import records at HS4 with gaps, duplicates and a missing value"""
+    rng = np.random.default_rng(7)
+    n = 400
+    df = pd.DataFrame({
+        'Nomenclature': 'H3',
+        'ReporterISO3': rng.choice(['CHN', 'USA', 'DEU', 'VNM', 'JPN'], n),
+        'ProductCode': rng.choice(['0101', '0102', '2701', '8471', '8517', '8542'], n),
+        'ReporterName': 'x',
+        'PartnerISO3': 'IND',
+        'PartnerName': 'India',
+        'Year': rng.choice([2014, 2015, 2018, 2022], n),
+        'TradeFlowName': 'Export',
+        'TradeFlowCode': 6,
+        VALUE: rng.uniform(0, 100, n).round(3),
+    })
+    df.loc[5, VALUE] = np.nan
+    return apply_trade_schema(df)
+
+
+def _pivot(records: pd.DataFrame, columns: str, sparse: SparseImports) -> np.ndarray:
+    """Year × columns sums of the records on the sparse axes"""
+    table = records.pivot_table(index='Year', columns=columns, values=VALUE,
+                                aggfunc='sum', observed=True, fill_value=0.0)
+    table.columns = table.columns.astype(str)
+    return table.reindex(index=sparse.years, columns=sparse.products, fill_value=0.0).to_numpy()
+
+
+def test_year_product_reductions_match_groupby(imports):
+    sparse = SparseImports(imports)
+
+    np.testing.assert_allclose(sparse.product_totals, _pivot(imports, 'ProductCode', sparse))
+
+    suppliers = (imports.groupby(['Year', 'ProductCode'], observed=True)['ReporterISO3']
+                 .nunique().unstack(fill_value=0))
+    suppliers.columns = suppliers.columns.astype(str)
+    np.testing.assert_array_equal(
+        sparse.product_suppliers,
+        suppliers.reindex(index=sparse.years, columns=sparse.products, fill_value=0).to_numpy()
+    )
+
+    for partner in ['CHN', 'JPN', 'KOR']:
+        expected = _pivot(imports[imports['ReporterISO3'] == partner], 'ProductCode', sparse)
+        np.testing.assert_allclose(sparse.partner_product_values(partner), expected)
+
+
+def test_product_stats_match_groupby(imports):
+    stats = SparseImports(imports).product_stats('CHN')
+
+    cells = imports.groupby(['Year', 'ProductCode', 'ReporterISO3'], observed=True)[VALUE].sum()
+    for (year, product), row in stats.iterrows():
+        values = cells.loc[(year, product)]
+        shares = values / values.sum() * 100
+        assert row['Total_Imports'] == pytest.approx(values.sum())
+        assert row['Suppliers'] == len(values)
+        assert row['HHI'] == pytest.approx((shares ** 2).sum())
+        assert row['Partner_Share'] == pytest.approx(shares.get('CHN', 0.0))
+
+
+def test_cube_partner_totals_match_groupby(imports):
+    cube = ImportCube(imports)
+
+    totals = imports.pivot_table(index='Year', columns='ReporterISO3', values=VALUE,
+                                 aggfunc='sum', observed=True, fill_value=0.0)
+    totals.columns = totals.columns.astype(str)
+    totals = totals.reindex(index=cube.years, columns=cube.partners, fill_value=0.0)
+    np.testing.assert_allclose(cube.partner_totals, totals.to_numpy())
+
+    shares = totals.div(totals.sum(axis=1), axis=0) * 100
+    np.testing.assert_allclose(cube.hhi, (shares ** 2).sum(axis=1).to_numpy())
+
+
+def test_product_metrics_match_groupby(imports):
+    calculator = DeriskingMetrics(TradeDataset.from_frame(imports))
+    chapter = imports['ProductCode'].astype(str).str[:2]
+
+    for year in [2015, 2022]:
+        records = imports[imports['Year'] == year]
+        for product in ['2701', '8542', '85']:
+            expected = records.loc[records['ProductCode'].astype(str).str.startswith(product), VALUE].sum()
+            assert calculator._get_product_imports(product, year) == pytest.approx(expected)
+
+        sector = records[chapter[records.index] == '85']
+        expected = sector.loc[sector['ReporterISO3'] == 'CHN', VALUE].sum() / sector[VALUE].sum() * 100
+        assert calculator.calculate_ssvi(year, ['85'], criticality_weight=3) == pytest.approx(expected * 3)
+        assert calculator.ssvi_matrix([year]).at[year, '85'] == pytest.approx(expected)
+
+    # Registered metrics evaluate alongside the product tables
+    table = calculator.evaluate(sorted(METRICS))
+    assert list(table.index) == [2014, 2015, 2018, 2022]
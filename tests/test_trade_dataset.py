@@ -0,0 +1,52 @@
+"""
+Tests for the shared trade dataset
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.trade_dataset import TradeDataset
+from src.trade_schema import apply_trade_schema
+from src.trade_store import TradeStore
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def records() -> pd.DataFrame:
+    """Imports and other flows of several years, rows in no particular order"""
+    rng = np.random.default_rng(3)
+    n = 300
+    df = pd.DataFrame({
+        'Nomenclature': 'H3',
+        'ReporterISO3': rng.choice(['CHN', 'USA', 'IND', 'VNM'], n),
+        'ProductCode': rng.choice(['07', '29', '85', '8517'], n),
+        'ReporterName': 'x',
+        'PartnerISO3': rng.choice(['IND', 'IND', 'USA'], n),
+        'PartnerName': 'y',
+        'Year': rng.choice([2015, 2016, 2022], n),
+        'TradeFlowName': rng.choice(['Export', 'Import'], n),
+        'TradeFlowCode': 6,
+        'TradeValue in 1000 USD': rng.uniform(0, 100, n).round(3),
+    })
+    df.loc[7, 'TradeValue in 1000 USD'] = np.nan
+    return df
+
+
+def test_csv_and_store_give_the_same_year_fingerprints(records, tmp_path):
+    csv_path = tmp_path / "consolidated_trade_data.csv"
+    records.to_csv(csv_path, index=False)
+    store_dir = TradeStore(tmp_path / "trade_store").write(apply_trade_schema(records.copy()))
+
+    from_csv = TradeDataset(csv_path).import_year_fingerprints()
+    from_store = TradeDataset(store_dir).import_year_fingerprints()
+    assert from_csv == from_store
+    assert sorted(from_csv) == [2015, 2016, 2022]
+
+    # A revised value changes only its year's fingerprint
+    row = records.index[(records['PartnerISO3'] == 'IND') & (records['TradeFlowName'] == 'Export')
+                        & (records['Year'] == 2016)][0]
+    records.loc[row, 'TradeValue in 1000 USD'] += 1.0
+    revised = TradeDataset.from_frame(records).import_year_fingerprints()
+    assert [year for year in from_csv if revised[year] != from_csv[year]] == [2016]